@@ -0,0 +1,101 @@
+"""
+Compares the JSON backends of core.serialization on rows holding the types
+of the encoder registry.
+
+    python benchmarks/json_encoders.py [rows] [repeat]
+"""
+
+import datetime
+import decimal
+import enum
+import json
+import os
+import sys
+import timeit
+import uuid
+
+from bson import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from core.serialization import json_dumps  # noqa: E402
+from core.utils.encoders import JSONEncoder, encode_default  # noqa: E402
+
+
+class Status(enum.Enum):
+    ACTIVE = "active"
+    SUSPENDED = "suspended"
+
+
+class StdlibEncoder(json.JSONEncoder):
+    """
+    isinstance chain, the way the types were encoded before the registry
+    """
+
+    def default(self, o):
+        if isinstance(o, ObjectId):
+            return str(o)
+        if isinstance(o, uuid.UUID):
+            return str(o)
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        if isinstance(o, enum.Enum):
+            return o.value
+        return super().default(o)
+
+
+def rows(count):
+    return [
+        {
+            "_id": ObjectId(),
+            "id": uuid.uuid4(),
+            "name": f"distributor {i}",
+            "balance": decimal.Decimal("1250.75"),
+            "status": Status.ACTIVE,
+            "created": datetime.datetime.utcnow(),
+            "employees": i % 50,
+        }
+        for i in range(count)
+    ]
+
+
+def main(count=1000, repeat=50):
+    data = rows(count)
+    app = Flask(__name__)
+    app.json_encoder = JSONEncoder
+    runs = {
+        "stdlib json, isinstance chain": lambda: json.dumps(data, cls=StdlibEncoder),
+        "stdlib json, encoder registry": lambda: json.dumps(
+            data, default=encode_default
+        ),
+    }
+    for backend in ("flask", "orjson"):
+        app.config["JSON_BACKEND"] = backend
+        with app.app_context():
+            try:
+                json_dumps([])
+            except ValueError:
+                print(f"{backend} backend is not available")
+                continue
+        runs[f"{backend} backend, encoder registry"] = lambda backend=backend: _dumps(
+            app, backend, data
+        )
+
+    baseline = None
+    for name, run in runs.items():
+        seconds = min(timeit.repeat(run, number=1, repeat=repeat))
+        baseline = baseline or seconds
+        print(f"{name:<36} {seconds * 1000:8.2f}ms  {baseline / seconds:5.1f}x")
+
+
+def _dumps(app, backend, data):
+    app.config["JSON_BACKEND"] = backend
+    with app.app_context():
+        return json_dumps(data)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
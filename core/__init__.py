@@ -3,6 +3,7 @@ from .notification_handler import NotificationHandler as NotificationHandler
 from .notifier import Notifier as Notifier
 from .utils import auth_role as auth_role
 from .utils import validator as validator
+from .utils import load_data as load_data
 from .service_result import handle_result as handle_result
 from .exceptions import AppException as AppException
 from .instance import initialize_instance as init_app
@@ -0,0 +1 @@
+from .backends import CacheBackend, LRUCache, RedisCache
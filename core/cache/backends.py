@@ -0,0 +1,154 @@
+import abc
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend(metaclass=abc.ABCMeta):
+    """
+    Base class of the caches that can be attached to a repository. Hits and
+    misses are counted per backend instance
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        returns the value stored for the key or None when it is missing or
+        expired
+        :param key: {str}
+        """
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @abc.abstractmethod
+    def _get(self, key):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        """
+        stores a value for the key
+        :param key: {str}
+        :param value: a picklable value, None values are not cached
+        :param ttl: {int} seconds before the value expires, defaults to self.ttl
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, *keys):
+        """
+        removes the keys passed from the cache
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear(self):
+        """
+        removes every key from the cache
+        """
+        raise NotImplementedError
+
+
+class LRUCache(CacheBackend):
+    """
+    In process cache that evicts the least recently used key once maxsize is
+    reached. Values are kept for ttl seconds
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        super().__init__(ttl)
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if value is None:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache shared by all workers, backed by redis. Values are pickled and
+    keys are namespaced with the prefix passed
+    """
+
+    def __init__(self, client=None, url=None, ttl=300, prefix="core:"):
+        super().__init__(ttl)
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl=None):
+        if value is None:
+            return
+        self.client.set(
+            self.prefix + key,
+            pickle.dumps(value),
+            ex=self.ttl if ttl is None else ttl,
+        )
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
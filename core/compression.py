@@ -0,0 +1,145 @@
+import threading
+import zlib
+
+from flask import Flask, current_app, request
+
+DEFAULT_MIMETYPES = [
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+]
+
+# wbits of zlib.compressobj for each content coding
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+class CompressionStats:
+    """
+    Counters of the responses compressed by this worker
+    """
+
+    def __init__(self):
+        self.responses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+
+    def add(self, bytes_in, bytes_out):
+        with self._lock:
+            self.responses += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_in - self.bytes_out
+
+    def to_dict(self) -> dict:
+        return {
+            "responses": self.responses,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_saved,
+            "ratio": self.bytes_out / self.bytes_in if self.bytes_in else 1.0,
+        }
+
+
+def init_compression(app: Flask):
+    """
+    Compresses responses with gzip or deflate, as accepted by the client, when
+    COMPRESS_ENABLED is set. Streamed responses are compressed chunk by chunk.
+    The counters are kept in app.extensions["compression"], see
+    compression_stats()
+
+    Configuration:
+        COMPRESS_ENABLED: enables compression
+        COMPRESS_MIN_SIZE: responses smaller than this many bytes are sent as
+        they are, defaults to 500. Streamed responses are always compressed
+        COMPRESS_MIMETYPES: mimetypes compressed, defaults to JSON, HTML,
+        CSS, JavaScript and plain text
+        COMPRESS_LEVEL: zlib compression level from 1 to 9, defaults to 6
+    """
+    if not app.config.get("COMPRESS_ENABLED"):
+        return
+
+    app.extensions["compression"] = CompressionStats()
+
+    @app.after_request
+    def compress_response(response):
+        config = current_app.config
+        if response.mimetype not in config.get("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES):
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        coding = request.accept_encodings.best_match(["gzip", "deflate"])
+        if coding is None:
+            return response
+        min_size = config.get("COMPRESS_MIN_SIZE", 500)
+        if not response.is_streamed and (response.content_length or 0) < min_size:
+            return response
+
+        level = config.get("COMPRESS_LEVEL", 6)
+        stats = current_app.extensions["compression"]
+        if response.is_streamed:
+            response.response = _compress_stream(
+                response.response, response.charset, coding, level, stats
+            )
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[coding])
+            compressed = compressor.compress(data) + compressor.flush()
+            response.set_data(compressed)
+            stats.add(len(data), len(compressed))
+
+        response.headers["Content-Encoding"] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def compression_stats(app: Flask = None) -> dict:
+    """
+    returns the compression counters of the app, None when compression is
+    disabled
+    """
+    stats = (app or current_app).extensions.get("compression")
+    return stats.to_dict() if stats else None
+
+
+def _compress_stream(chunks, charset, coding, level, stats):
+    """
+    Compresses every chunk as soon as it is produced, flushing the compressor
+    after each one so clients receive data without waiting for the end of
+    the response
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[coding])
+    bytes_in = bytes_out = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, str):
+                chunk = chunk.encode(charset)
+            compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            bytes_in += len(chunk)
+            bytes_out += len(compressed)
+            yield compressed
+        tail = compressor.flush()
+        bytes_out += len(tail)
+        yield tail
+    finally:
+        stats.add(bytes_in, bytes_out)
+        if hasattr(chunks, "close"):
+            chunks.close()
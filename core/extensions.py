@@ -1,10 +1,10 @@
-from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_marshmallow import Marshmallow
+from .routing import RoutingSQLAlchemy
 from .utils import GUID
 
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
 migrate = Migrate()
 ma = Marshmallow()
 db.__setattr__("GUID", GUID)
@@ -0,0 +1,2 @@
+from .recorder import record_filter, recording_enabled
+from .advisor import init_index_advisor, suggest_indexes
@@ -0,0 +1,182 @@
+import json
+from collections import namedtuple
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+from sqlalchemy import inspect
+
+from ..extensions import db
+from .recorder import recorded_filters, reset_recording
+
+IndexSuggestion = namedtuple(
+    "IndexSuggestion", ["backend", "table", "columns", "reason"]
+)
+
+
+def init_index_advisor(app: Flask):
+    index_cli = AppGroup("index")
+
+    @index_cli.command("advise")
+    @click.option(
+        "--alembic",
+        "-a",
+        "alembic",
+        is_flag=True,
+        help="print an Alembic migration stub instead of CREATE INDEX statements",
+    )
+    def advise(alembic):
+        suggestions = suggest_indexes(app)
+        if not suggestions:
+            click.echo("Every recorded filter is covered by an index")
+            return
+
+        sql_suggestions = [s for s in suggestions if s.backend == "sql"]
+        if alembic and sql_suggestions:
+            click.echo(alembic_stub(sql_suggestions))
+        else:
+            for suggestion in sql_suggestions:
+                click.echo(
+                    f"CREATE INDEX {index_name(suggestion)} ON {suggestion.table} "
+                    f"({', '.join(suggestion.columns)});  -- {suggestion.reason}"
+                )
+        for suggestion in suggestions:
+            if suggestion.backend == "mongo":
+                keys = ", ".join(f'"{column}": 1' for column in suggestion.columns)
+                click.echo(
+                    f"db.{suggestion.table}.createIndex({{{keys}}})"
+                    f"  // {suggestion.reason}"
+                )
+
+    @index_cli.command("reset")
+    def reset():
+        reset_recording(app)
+        click.echo("Recorded filters removed")
+
+    app.cli.add_command(index_cli)
+
+
+def suggest_indexes(app: Flask) -> list:
+    """
+    Compares the filters recorded at runtime, and on SQL databases the foreign
+    key columns, with the existing indexes. A filter is considered covered
+    when an index starts with one of the fields it filters on, or with its
+    first sort field when it has no filter
+    :return: {list} of IndexSuggestion
+    """
+    shapes = recorded_filters(app)
+    with app.app_context():
+        if app.config["DB_ENGINE"] == "MONGODB":
+            return _mongo_suggestions(shapes)
+        return _sql_suggestions(shapes)
+
+
+def index_name(suggestion) -> str:
+    return f"ix_{suggestion.table}_{'_'.join(suggestion.columns)}"
+
+
+def alembic_stub(suggestions) -> str:
+    upgrade = [
+        f"    op.create_index({json.dumps(index_name(s))}, {json.dumps(s.table)}, "
+        f"{json.dumps(list(s.columns))})  # {s.reason}"
+        for s in suggestions
+    ]
+    downgrade = [
+        f"    op.drop_index({json.dumps(index_name(s))}, "
+        f"table_name={json.dumps(s.table)})"
+        for s in reversed(suggestions)
+    ]
+    return "\n".join(
+        ["def upgrade():", *upgrade, "", "", "def downgrade():", *downgrade]
+    )
+
+
+def _sql_suggestions(shapes) -> list:
+    inspector = inspect(db.engine)
+    tables = inspector.get_table_names()
+    indexes = {table: _sql_indexes(inspector, table) for table in tables}
+
+    suggestions = []
+    for table in tables:
+        for foreign_key in inspector.get_foreign_keys(table):
+            columns = tuple(foreign_key["constrained_columns"])
+            if _covered(indexes[table], columns[:1]):
+                continue
+            suggestions.append(
+                IndexSuggestion(
+                    "sql",
+                    table,
+                    columns,
+                    f"foreign key to {foreign_key['referred_table']}",
+                )
+            )
+    suggestions.extend(_filter_suggestions("sql", shapes, indexes))
+    return _distinct(suggestions)
+
+
+def _sql_indexes(inspector, table) -> list:
+    indexes = [inspector.get_pk_constraint(table)["constrained_columns"]]
+    indexes.extend(index["column_names"] for index in inspector.get_indexes(table))
+    indexes.extend(
+        constraint["column_names"]
+        for constraint in inspector.get_unique_constraints(table)
+    )
+    return [index for index in indexes if index]
+
+
+def _mongo_suggestions(shapes) -> list:
+    from mongoengine.connection import get_db
+
+    database = get_db()
+    collections = {table for backend, table, _, _ in shapes if backend == "mongo"}
+    indexes = {
+        collection: [
+            [key for key, _ in index["key"]]
+            for index in database[collection].index_information().values()
+        ]
+        for collection in collections
+    }
+    return _distinct(_filter_suggestions("mongo", shapes, indexes))
+
+
+def _filter_suggestions(backend, shapes, indexes) -> list:
+    suggestions = []
+    for shape_backend, table, fields, sort in shapes:
+        if shape_backend != backend or table not in indexes:
+            continue
+        if _covered(indexes[table], fields or sort[:1]):
+            continue
+        columns = fields + tuple(column for column in sort if column not in fields)
+        reasons = []
+        if fields:
+            reasons.append(f"filtered by {', '.join(fields)}")
+        if sort:
+            reasons.append(f"ordered by {', '.join(sort)}")
+        suggestions.append(IndexSuggestion(backend, table, columns, " ".join(reasons)))
+    return suggestions
+
+
+def _covered(indexes, leading) -> bool:
+    """
+    an index serves a query when its first column is one of the columns the
+    query filters on, or the column it is ordered by
+    """
+    return any(index[0] in leading for index in indexes)
+
+
+def _distinct(suggestions) -> list:
+    """
+    drops duplicate suggestions, and suggestions whose columns are a prefix of
+    another index suggested for the same table
+    """
+    distinct = []
+    for suggestion in suggestions:
+        if not any(
+            other.table == suggestion.table
+            and other.columns[: len(suggestion.columns)] == suggestion.columns
+            and (len(other.columns) > len(suggestion.columns) or other in distinct)
+            for other in suggestions
+            if other is not suggestion
+        ):
+            distinct.append(suggestion)
+    return distinct
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+
+from flask import Flask, current_app, has_app_context
+
+_recorded = set()
+_lock = threading.Lock()
+
+
+def recording_path(app: Flask) -> str:
+    """
+    returns the file filter shapes are appended to, INDEX_ADVISOR_FILE or
+    index_advisor.jsonl in the instance folder
+    """
+    return app.config.get("INDEX_ADVISOR_FILE") or os.path.join(
+        app.instance_path, "index_advisor.jsonl"
+    )
+
+
+def recording_enabled() -> bool:
+    """
+    returns whether query shapes are recorded, INDEX_ADVISOR_RECORD is set in
+    the current app
+    """
+    return has_app_context() and bool(current_app.config.get("INDEX_ADVISOR_RECORD"))
+
+
+def record_filter(backend, table, fields, sort=()):
+    """
+    Records the shape of a repository query, the fields it filters on and the
+    fields it is ordered by, when INDEX_ADVISOR_RECORD is set. Every shape is
+    logged and written to the recording file once per process, the
+    `flask index advise` command compares them with the existing indexes
+
+    :param backend: {str} "sql" or "mongo"
+    :param table: {str} table or collection name
+    :param fields: {list} column or database field names filtered on
+    :param sort: {list} column or database field names ordered by
+    """
+    if not recording_enabled():
+        return
+    if not fields and not sort:
+        return
+
+    shape = (backend, table, tuple(sorted(fields)), tuple(sort))
+    if shape in _recorded:
+        return
+
+    record = {
+        "backend": backend,
+        "table": table,
+        "fields": list(shape[2]),
+        "sort": list(shape[3]),
+    }
+    path = recording_path(current_app)
+    with _lock:
+        if shape in _recorded:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            # the shape is not marked as recorded, the next query retries
+            current_app.logger.error("Failed to record query shape to %s: %s", path, e)
+            return
+        _recorded.add(shape)
+
+    current_app.logger.info(
+        "Query on %s filtered by %s ordered by %s", table, shape[2], shape[3]
+    )
+
+
+def recorded_filters(app: Flask) -> list:
+    """
+    returns the distinct shapes found in the recording file
+    :return: {list} of (backend, table, fields, sort) tuples
+    """
+    path = recording_path(app)
+    if not os.path.exists(path):
+        return []
+
+    shapes = set()
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            shapes.add(
+                (
+                    record["backend"],
+                    record["table"],
+                    tuple(record["fields"]),
+                    tuple(record["sort"]),
+                )
+            )
+    return sorted(shapes)
+
+
+def reset_recording(app: Flask):
+    with _lock:
+        _recorded.clear()
+        path = recording_path(app)
+        if os.path.exists(path):
+            os.remove(path)
@@ -8,7 +8,11 @@ from .extensions import db, migrate, ma
 
 from flask_swagger_ui import get_swaggerui_blueprint
 from werkzeug.exceptions import HTTPException
+from .compression import init_compression
 from .generators import init_generators
+from .index_advisor import init_index_advisor
+from .instrumentation import init_query_instrumentation
+from .utils.encoders import JSONEncoder
 
 from .api_spec import spec
 from .exceptions import (
@@ -33,6 +37,7 @@ def initialize_instance(app: Flask):
     path = os.path.join(basedir, "../app/instance")
     app.instance_path = path
     app.logger.addHandler(default_handler)
+    app.json_encoder = JSONEncoder
     # add extensions
     register_extensions(app)
     register_blueprints(app)
@@ -49,10 +54,13 @@ def register_extensions(flask_app):
     elif flask_app.config["DB_ENGINE"] == "POSTGRES":
         db.init_app(flask_app)
         migrate.init_app(flask_app, db)
+        init_query_instrumentation(flask_app)
         with flask_app.app_context():
             db.create_all()
     factory.init_app(flask_app, db)
     init_generators(flask_app)
+    init_index_advisor(flask_app)
+    init_compression(flask_app)
     ma.init_app(flask_app)
 
     @flask_app.errorhandler(HTTPException)
@@ -0,0 +1,127 @@
+import time
+from collections import Counter
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised in testing when a request issues more queries than the budget
+    configured for its endpoint
+    """
+
+
+class QueryStats:
+    __slots__ = ["count", "duration", "statements"]
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def repeated_statements(self, threshold):
+        """
+        returns the statements issued at least threshold times, which usually
+        means a relationship is lazy loaded once per row (N+1 queries)
+        :param threshold: {int}
+        :return: {list} of (statement, count) tuples
+        """
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+
+def init_query_instrumentation(app: Flask):
+    """
+    Counts the SQL queries and database time of every request when
+    SQL_QUERY_INSTRUMENTATION is set.
+
+    Configuration:
+        SQL_QUERY_INSTRUMENTATION: enables the instrumentation
+        SQL_QUERY_HEADERS: adds X-DB-Query-Count and X-DB-Query-Time headers to
+        responses, enabled by default
+        SQL_N_PLUS_ONE_THRESHOLD: number of times an identical statement may run
+        in a request before it is logged as a possible N+1, defaults to 5
+        SQL_QUERY_BUDGET: default maximum number of queries per request
+        SQL_QUERY_BUDGETS: {dict} maximum number of queries per endpoint.
+        Exceeding a budget is logged, and raises QueryBudgetExceeded in testing
+    """
+    if not app.config.get("SQL_QUERY_INSTRUMENTATION"):
+        return
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = query_stats()
+        if stats is None:
+            return response
+
+        config = current_app.config
+        if config.get("SQL_QUERY_HEADERS", True):
+            response.headers["X-DB-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Query-Time"] = f"{stats.duration * 1000:.2f}"
+        current_app.logger.info(
+            "%s issued %d queries in %.2fms",
+            request.endpoint,
+            stats.count,
+            stats.duration * 1000,
+        )
+
+        threshold = config.get("SQL_N_PLUS_ONE_THRESHOLD", 5)
+        for statement, count in stats.repeated_statements(threshold):
+            current_app.logger.warning(
+                "Possible N+1 query in %s, statement issued %d times: %s",
+                request.endpoint,
+                count,
+                statement,
+            )
+
+        budget = config.get("SQL_QUERY_BUDGETS", {}).get(
+            request.endpoint, config.get("SQL_QUERY_BUDGET")
+        )
+        if budget is not None and stats.count > budget:
+            message = (
+                f"{request.endpoint} issued {stats.count} queries, "
+                f"budget is {budget}"
+            )
+            current_app.logger.warning(message)
+            if current_app.testing:
+                raise QueryBudgetExceeded(message)
+        return response
+
+
+def query_stats():
+    """
+    returns the QueryStats of the current request, None outside a request or
+    when the instrumentation is disabled
+    """
+    if not has_request_context():
+        return None
+    return g.get("query_stats")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = query_stats()
+    start_time = getattr(context, "query_start_time", None)
+    if stats is None or start_time is None:
+        return
+
+    stats.count += 1
+    stats.duration += time.perf_counter() - start_time
+    stats.statements[statement] += 1
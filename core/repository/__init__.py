@@ -1 +1,2 @@
-from .base import MongoBaseRepository, SQLBaseRepository
+from .base import MongoBaseRepository, SQLBaseRepository, Page
+from .unit_of_work import unit_of_work
@@ -1,2 +1,3 @@
 from .sql_base_repository import SQLBaseRepository
 from .mongo_base_repository import MongoBaseRepository
+from .pagination import Page
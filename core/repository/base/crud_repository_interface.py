@@ -28,9 +28,10 @@ class CRUDRepositoryInterface(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def index(self):
+    def index(self, fields=None):
         """
         when inherited, index should show all data belonging to a model
+        :param fields: optional list of fields to load instead of whole objects
         :return: obj_data
         """
         raise NotImplementedError
@@ -67,21 +68,144 @@ class CRUDRepositoryInterface(metaclass=abc.ABCMeta):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def find(self, data):
+    def find(self, data, fields=None):
         """
         when inherited, should find a record by the parameters passed
         :param data:
+        :param fields: optional list of fields to load instead of the whole object
         :return: a model object
         """
 
     @abc.abstractmethod
-    def find_all(self, data):
+    def find_all(self, data, fields=None):
         """
         when inherited, should find all records by the parameters passed
         :param data:
+        :param fields: optional list of fields to load instead of whole objects
         :return: a model object
         """
 
+    @abc.abstractmethod
+    def create_many(self, objs_in):
+        """
+        when inherited, should create all the records passed in a single batch.
+        SQL repositories create all the records or none, Mongo repositories
+        create every valid document and report the number written along with
+        the errors
+        :param objs_in: list of the data you want to use to create the models
+        :return: number of records created
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update_many(self, obj_ids, obj_in):
+        """
+        when inherited, should apply the same update to all the records whose
+        ids are passed in a single batch
+        :param obj_ids: ids of the records to update
+        :param obj_in: the data you want to update with
+        :return: number of records updated
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_many(self, obj_ids):
+        """
+        when inherited, should delete all the records whose ids are passed in a
+        single batch
+        :param obj_ids: ids of the records to delete
+        :return: number of records deleted
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upsert(self, obj_in, conflict_target=None):
+        """
+        when inherited, should create a record or update the existing record
+        matching it on the conflict target in a single round-trip
+        :param obj_in: the data you want to use to create or update the model
+        :param conflict_target: fields of a unique constraint
+        :return: a model object
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def upsert_many(self, objs_in, conflict_target=None):
+        """
+        when inherited, should create or update all the records passed in a
+        single batch
+        :param objs_in: list of the data to create or update the models with
+        :param conflict_target: fields of a unique constraint
+        :return: number of records written
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iter_all(self, chunk_size=None):
+        """
+        when inherited, should lazily yield all records of the model, fetching
+        chunk_size records at a time
+        :param chunk_size: number of records fetched per round-trip
+        :return: a generator of model objects
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def iter_filtered(self, filter_param, chunk_size=None):
+        """
+        when inherited, should lazily yield all records matching the parameters
+        passed, fetching chunk_size records at a time
+        :param filter_param:
+        :param chunk_size: number of records fetched per round-trip
+        :return: a generator of model objects
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def count(self, filter_param=None, estimated=False):
+        """
+        when inherited, should return the number of records matching the
+        parameters passed
+        :param filter_param: optional parameters to filter by
+        :param estimated: return a cheap estimate of the size of the whole
+        table or collection instead of an exact count
+        :return: int
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def version(self, filter_param=None):
+        """
+        when inherited, should return a tag that changes whenever a record
+        matching the parameters passed is created, updated or deleted, along
+        with their last modification date
+        :param filter_param: optional parameters to filter by
+        :return: a (version tag, last modified) tuple
+        """
+
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def paginate(self, filter_param=None, cursor=None, limit=None):
+        """
+        when inherited, should return a page of records ordered by an indexed
+        column, starting after the cursor passed
+        :param filter_param: optional parameters to filter by
+        :param cursor: opaque cursor returned with the previous page
+        :param limit: number of records per page
+        :return: a Page object
+        """
+
+        raise NotImplementedError
+
     @abc.abstractmethod
     def delete(self, id):
         """
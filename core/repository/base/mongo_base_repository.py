@@ -1,8 +1,13 @@
 import mongoengine
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, PyMongoError
+from ...cache import CacheBackend, LRUCache
 from ...exceptions.app_exceptions import AppException
+from ...index_advisor import record_filter, recording_enabled
 from ...repository.base.crud_repository_interface import (
     CRUDRepositoryInterface,
 )
+from .pagination import Page, decode_cursor, encode_cursor, page_size, version_tag
 
 
 class MongoBaseRepository(CRUDRepositoryInterface):
@@ -12,9 +17,37 @@ class MongoBaseRepository(CRUDRepositoryInterface):
     """
 
     model: mongoengine
+    default_page_size: int = 20
+    max_page_size: int = 100
+    # number of documents fetched per round-trip by iter_all and iter_filtered
+    chunk_size: int = 1000
+    # read-through cache used by find_by_id, e.g. LRUCache() or RedisCache()
+    cache: CacheBackend = None
+    # fields of the unique index upsert resolves conflicts on, defaults to
+    # the primary key. e.g. ("email_address",)
+    upsert_conflict_target: tuple = None
+    # exact counts are kept for a few seconds per filter, set to None to
+    # always count
+    count_cache: CacheBackend = LRUCache(maxsize=1024, ttl=5)
+    # number of operations sent per bulk_write by create_many, update_many,
+    # delete_many and upsert_many
+    batch_size: int = 1000
+    # field holding the last modification date of a document, used by
+    # version()
+    modified_field: str = "modified"
+    # write concern of the bulk writes, e.g. {"w": "majority", "j": True}.
+    # Defaults to the write concern of the connection
+    write_concern: dict = None
 
-    def index(self):
-        return self.model.objects()
+    def index(self, fields=None, raw=False):
+        """
+
+        :param fields: {list} optional field names to load. When passed, raw
+        dictionaries holding only these fields are returned instead of documents
+        :param raw: {bool} return raw dictionaries instead of documents
+        :return: {QuerySet}
+        """
+        return self._project(self.model.objects(), fields, raw)
 
     def create(self, obj_in):
         """
@@ -26,10 +59,13 @@ class MongoBaseRepository(CRUDRepositoryInterface):
 
         db_obj = self.model(**obj_in)
         db_obj.save()
+        self._invalidate_cache(db_obj.pk)
         return db_obj
 
     def update_by_id(self, item_id, obj_in):
         """
+        Updates the document with a single find_one_and_update, so concurrent
+        updates are never overwritten by a stale read
         :param item_id: {int}
         :param obj_in: {dict}
         :return: model_object - Returns an instance object of the model passed
@@ -37,8 +73,12 @@ class MongoBaseRepository(CRUDRepositoryInterface):
         assert item_id, "Missing object id to update"
         assert obj_in, "No new data to update with"
 
-        db_obj = self.find_by_id(item_id)
-        db_obj.modify(**obj_in)
+        db_obj = self.model.objects(pk=item_id).modify(new=True, **obj_in)
+        self._invalidate_cache(item_id)
+        if db_obj is None:
+            raise AppException.NotFoundException(
+                f"Resource of id {item_id} does not exist"
+            )
         return db_obj
 
     def find_by_id(self, obj_id):
@@ -50,20 +90,30 @@ class MongoBaseRepository(CRUDRepositoryInterface):
 
         assert obj_id, "Missing object id to find"
 
+        if self.cache is not None:
+            son = self.cache.get(self._cache_key(obj_id))
+            if son is not None:
+                return self.model._from_son(son)
+
         try:
             db_obj = self.model.objects.get(pk=obj_id)
+            if self.cache is not None:
+                self.cache.set(self._cache_key(obj_id), db_obj.to_mongo().to_dict())
             return db_obj
         except mongoengine.DoesNotExist:
             raise AppException.NotFoundException(
                 f"Resource of id {obj_id} does not exist"
             )
 
-    def find(self, filter_param):
+    def find(self, filter_param, fields=None, raw=False):
         """
         returns an item that satisfies the data passed to it if it exists in
         the database
 
         :param filter_param: {dict}
+        :param fields: {list} optional field names to load, a raw dictionary
+        holding only these fields is returned instead of a document
+        :param raw: {bool} return a raw dictionary instead of a document
         :return: model_object - Returns an instance object of the model passed
         """
 
@@ -72,17 +122,21 @@ class MongoBaseRepository(CRUDRepositoryInterface):
             filter_param, dict
         ), "Filter parameters should be of type dictionary"
 
+        self._record_filter(filter_param)
         try:
-            db_obj = self.model.objects.get(**filter_param)
+            db_obj = self._project(self.model.objects, fields, raw).get(**filter_param)
             return db_obj
         except mongoengine.DoesNotExist:
             raise AppException.NotFoundException("Resource does not exist")
 
-    def find_all(self, filter_param):
+    def find_all(self, filter_param, fields=None, raw=False):
         """
         returns all items that satisfies the filter params passed to it
 
         :param filter_param: {dict}
+        :param fields: {list} optional field names to load, raw dictionaries
+        holding only these fields are returned instead of documents
+        :param raw: {bool} return raw dictionaries instead of documents
         :return: model_object - Returns an instance object of the model passed
         """
         assert filter_param, "Missing filter parameters"
@@ -90,7 +144,8 @@ class MongoBaseRepository(CRUDRepositoryInterface):
             filter_param, dict
         ), "Filter parameters should be of type dictionary"
 
-        db_obj = self.model.objects(**filter_param)
+        self._record_filter(filter_param)
+        db_obj = self._project(self.model.objects(**filter_param), fields, raw)
         return db_obj
 
     def delete(self, item_id):
@@ -103,5 +158,401 @@ class MongoBaseRepository(CRUDRepositoryInterface):
 
         assert item_id, "Missing id of object to be deleted"
 
-        db_obj = self.find_by_id(item_id)
-        db_obj.delete()
+        deleted = self.model.objects(pk=item_id).delete()
+        self._invalidate_cache(item_id)
+        if not deleted:
+            raise AppException.NotFoundException(
+                f"Resource of id {item_id} does not exist"
+            )
+
+    def create_many(self, objs_in) -> int:
+        """
+        Inserts all the documents passed with unordered bulk writes of
+        batch_size documents. Writes are not all or nothing: a failing document
+        does not stop the others from being inserted, the errors of all batches
+        are raised together once every batch has been written
+
+        :param objs_in: {list} the data you want to use to create the models
+        :return: {int} number of documents created
+        :raises OperationError: with {"written": number of documents created,
+        "errors": [{"index": ..., "error": ...}]} when a document failed
+        """
+        assert objs_in, "Missing data to be saved"
+
+        operations, references, errors = [], [], []
+        for index, obj_in in enumerate(objs_in):
+            try:
+                db_obj = self.model(**obj_in)
+                db_obj.validate()
+            except mongoengine.ValidationError as e:
+                errors.append({"index": index, "error": str(e)})
+                continue
+            operations.append(InsertOne(db_obj.to_mongo().to_dict()))
+            references.append({"index": index})
+
+        created = self._bulk_write(operations, references, errors, ("nInserted",))
+        if errors:
+            raise AppException.OperationError({"written": created, "errors": errors})
+        return created
+
+    def update_many(self, obj_ids, obj_in) -> int:
+        """
+        Applies the same update to all documents matching the ids passed with
+        unordered bulk writes of batch_size updates. Like create_many, a
+        failing update does not stop the others
+
+        :param obj_ids: {list} ids of documents to update
+        :param obj_in: {dict} update data applied to every document
+        :return: {int} number of documents matched
+        :raises OperationError: with {"written": number of documents matched,
+        "errors": [{"id": ..., "error": ...}]} when an update failed
+        """
+        assert obj_ids, "Missing ids of objects to update"
+        assert obj_in, "Missing update data"
+        assert isinstance(obj_in, dict), "Update data should be a dictionary"
+
+        son = self.model(**obj_in).to_mongo()
+        db_fields = [self.model._fields[field].db_field for field in obj_in]
+        update = {"$set": {field: son.get(field) for field in db_fields}}
+        updated = self._bulk_write_by_id(
+            obj_ids, lambda pk: UpdateOne({"_id": pk}, update), ("nMatched",)
+        )
+        return updated
+
+    def delete_many(self, obj_ids) -> int:
+        """
+        Deletes all documents matching the ids passed with unordered bulk
+        writes of batch_size deletes. Like create_many, a failing delete does
+        not stop the others
+
+        :param obj_ids: {list} ids of documents to delete
+        :return: {int} number of documents deleted
+        :raises OperationError: with {"written": number of documents deleted,
+        "errors": [{"id": ..., "error": ...}]} when a delete failed
+        """
+        assert obj_ids, "Missing ids of objects to delete"
+
+        deleted = self._bulk_write_by_id(
+            obj_ids, lambda pk: DeleteOne({"_id": pk}), ("nRemoved",)
+        )
+        return deleted
+
+    def _bulk_write_by_id(self, obj_ids, operation, count_keys) -> int:
+        """
+        Runs one operation per id passed, ids that are not valid primary key
+        values are reported with the write errors
+        """
+        pk_field = self.model._fields[self.model._meta["id_field"]]
+        operations, references, errors = [], [], []
+        for obj_id in obj_ids:
+            try:
+                pk = pk_field.to_mongo(obj_id)
+            except mongoengine.ValidationError as e:
+                errors.append({"id": str(obj_id), "error": str(e)})
+                continue
+            operations.append(operation(pk))
+            references.append({"id": str(obj_id)})
+
+        written = self._bulk_write(operations, references, errors, count_keys)
+        self._invalidate_cache(*obj_ids)
+        if errors:
+            raise AppException.OperationError({"written": written, "errors": errors})
+        return written
+
+    def _bulk_write(self, operations, references, errors, count_keys) -> int:
+        """
+        Sends the operations in unordered bulk writes of batch_size operations
+        and appends the error of every failed operation to errors
+
+        :param operations: {list} pymongo write operations
+        :param references: {list} reference of the document of each operation
+        :param errors: {list} the errors collected so far
+        :param count_keys: {tuple} keys of the bulk write result summed up to
+        the count returned, e.g. ("nInserted",)
+        :return: {int} number of documents written
+        """
+        collection = self.model._get_collection()
+        if self.write_concern is not None:
+            collection = collection.with_options(
+                write_concern=WriteConcern(**self.write_concern)
+            )
+
+        written = 0
+        for start in range(0, len(operations), self.batch_size):
+            batch = operations[start : start + self.batch_size]
+            try:
+                result = collection.bulk_write(batch, ordered=False).bulk_api_result
+            except BulkWriteError as e:
+                result = e.details
+                errors.extend(
+                    {**references[start + error["index"]], "error": error["errmsg"]}
+                    for error in result["writeErrors"]
+                )
+            written += sum(result[count_key] for count_key in count_keys)
+        return written
+
+    def upsert(self, obj_in, conflict_target=None):
+        """
+        Inserts a document, or updates the existing document matching it on the
+        conflict target, with a single find_one_and_update(upsert=True)
+
+        :param obj_in: {dict} the data you want to use to create or update the model
+        :param conflict_target: {tuple} fields of a unique index, defaults to
+        upsert_conflict_target
+        :return: {object} - Returns an instance object of the model passed
+        """
+        assert obj_in, "Missing data to be saved"
+
+        query, update = self._upsert_operation(obj_in, conflict_target)
+        try:
+            son = self.model._get_collection().find_one_and_update(
+                query, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except PyMongoError as e:
+            raise AppException.OperationError(str(e))
+
+        self._invalidate_cache(son["_id"])
+        return self.model._from_son(son)
+
+    def upsert_many(self, objs_in, conflict_target=None) -> int:
+        """
+        Inserts or updates all the documents passed with unordered bulk writes
+        of batch_size upserts. Like create_many, a failing upsert does not stop
+        the others
+
+        :param objs_in: {list} the data you want to use to create or update the models
+        :param conflict_target: {tuple} fields of a unique index, defaults to
+        upsert_conflict_target
+        :return: {int} number of documents inserted or matched
+        :raises OperationError: with {"written": number of documents inserted
+        or matched, "errors": [{"index": ..., "error": ...}]} when an upsert failed
+        """
+        assert objs_in, "Missing data to be saved"
+
+        upserts = [self._upsert_operation(obj_in, conflict_target) for obj_in in objs_in]
+        operations = [UpdateOne(query, update, upsert=True) for query, update in upserts]
+        references = [{"index": index} for index in range(len(upserts))]
+        errors = []
+        written = self._bulk_write(
+            operations, references, errors, ("nUpserted", "nMatched")
+        )
+
+        if self.cache is not None:
+            documents = self.model._get_collection().find(
+                {"$or": [query for query, _ in upserts]}, projection=["_id"]
+            )
+            self._invalidate_cache(*[son["_id"] for son in documents])
+        if errors:
+            raise AppException.OperationError({"written": written, "errors": errors})
+        return written
+
+    def _upsert_operation(self, obj_in, conflict_target):
+        """
+        Builds the filter and update documents of an upsert. Fields passed are
+        set on every write, default values only when the document is inserted
+        """
+        db_obj = self.model(**obj_in)
+        son = db_obj.to_mongo()
+        fields = [self.model._fields[field].db_field for field in obj_in]
+        target = conflict_target or self.upsert_conflict_target or ("pk",)
+        if "pk" in target:
+            target = [self.model._meta["id_field"] if f == "pk" else f for f in target]
+        query = {}
+        for field in target:
+            db_field = self.model._fields[field].db_field
+            assert db_field in son, "Missing conflict values"
+            query[db_field] = son[db_field]
+
+        update = {
+            "$set": {field: son.get(field) for field in fields if field not in query}
+        }
+        set_on_insert = {
+            field: value
+            for field, value in son.items()
+            if field not in fields and field not in query and field != "_id"
+        }
+        if set_on_insert:
+            update["$setOnInsert"] = set_on_insert
+        if not update["$set"]:
+            del update["$set"]
+        return query, update
+
+    def iter_all(self, chunk_size=None):
+        """
+        Streams every document of the model in batches without caching them on
+        the queryset, so memory stays bounded by the batch size
+
+        :param chunk_size: {int} documents fetched per round-trip
+        :return: {generator} instances of the model
+        """
+        return self._stream(self.model.objects(), chunk_size)
+
+    def iter_filtered(self, filter_param, chunk_size=None):
+        """
+        Streams every document that satisfies the filter params passed to it
+
+        :param filter_param: {dict}
+        :param chunk_size: {int} documents fetched per round-trip
+        :return: {generator} instances of the model
+        """
+        assert filter_param, "Missing filter parameters"
+        assert isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+
+        self._record_filter(filter_param)
+        return self._stream(self.model.objects(**filter_param), chunk_size)
+
+    def _stream(self, query_set, chunk_size):
+        yield from query_set.no_cache().batch_size(chunk_size or self.chunk_size)
+
+    def count(self, filter_param=None, estimated=False) -> int:
+        """
+        Returns the number of documents matching the filter params passed.
+        Exact counts are cached for a short time in count_cache
+
+        :param filter_param: {dict} optional parameters to be filtered by
+        :param estimated: {bool} return the estimate from the collection
+        metadata instead of counting. Only used when there are no filter
+        parameters
+        :return: {int}
+        """
+        assert filter_param is None or isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+
+        filter_param = filter_param or {}
+        self._record_filter(filter_param)
+        if estimated and not filter_param:
+            return self.model._get_collection().estimated_document_count()
+
+        key = (
+            f"{self.model._get_collection_name()}:count:"
+            f"{sorted(filter_param.items())!r}"
+        )
+        if self.count_cache is not None:
+            count = self.count_cache.get(key)
+            if count is not None:
+                return count
+
+        count = self.model.objects(**filter_param).count()
+        if self.count_cache is not None:
+            self.count_cache.set(key, count)
+        return count
+
+    def version(self, filter_param=None) -> tuple:
+        """
+        Returns a version tag of the documents matching the query parameters
+        and their last modification date, read with a single aggregation. The
+        tag changes whenever a matching document is created, updated or
+        deleted, so it can be passed to handle_result as etag
+        :param filter_param: {dict} optional parameters to be filtered by
+        :return: {tuple} (version tag, last modified datetime or None)
+        """
+        assert filter_param is None or isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+        assert (
+            self.modified_field in self.model._fields
+        ), f"{self.model.__name__} has no {self.modified_field} field"
+
+        db_field = self.model._fields[self.modified_field].db_field
+        pipeline = [
+            {
+                "$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "last_modified": {"$max": f"${db_field}"},
+                }
+            }
+        ]
+        groups = list(self.model.objects(**(filter_param or {})).aggregate(pipeline))
+        count, last_modified = 0, None
+        if groups:
+            count, last_modified = groups[0]["count"], groups[0]["last_modified"]
+        tag = version_tag(self.model._get_collection_name(), count, last_modified)
+        return tag, last_modified
+
+    def paginate(
+        self, filter_param=None, cursor=None, limit=None, fields=None, raw=False
+    ) -> Page:
+        """
+        Returns a page of documents ordered by their primary key, starting after
+        the cursor passed. Pages are fetched with a range query on the primary
+        key instead of skip/limit
+
+        :param filter_param: {dict} optional parameters to be filtered by
+        :param cursor: {str} next_cursor of the previous page
+        :param limit: {int} page size, capped at max_page_size
+        :param fields: {list} optional field names to load, raw dictionaries
+        holding only these fields are returned instead of documents
+        :param raw: {bool} return raw dictionaries instead of documents
+        :return: {Page} items of the page and the cursor of the next page
+        """
+        assert filter_param is None or isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+
+        limit = page_size(limit, self.default_page_size, self.max_page_size)
+        self._record_filter(filter_param or {}, ["pk"])
+        query_set = self.model.objects(**(filter_param or {}))
+        if cursor:
+            (last_id,) = decode_cursor(cursor, [None])
+            pk_field = self.model._fields[self.model._meta["id_field"]]
+            try:
+                last_id = pk_field.to_mongo(last_id)
+            except mongoengine.ValidationError:
+                raise AppException.BadRequest("Invalid pagination cursor")
+            query_set = query_set.filter(pk__gt=last_id)
+
+        query_set = self._project(query_set.order_by("pk"), fields, raw)
+        documents = list(query_set.limit(limit + 1))
+        items = documents[:limit]
+        next_cursor = None
+        if len(documents) > limit:
+            last = items[-1]
+            last_id = last["_id"] if isinstance(last, dict) else last.pk
+            next_cursor = encode_cursor([last_id])
+        return Page(items, next_cursor)
+
+    @staticmethod
+    def _project(query_set, fields, raw=False):
+        """
+        Restricts the queryset to the fields passed and skips building
+        documents, returning raw dictionaries instead. Raw dictionaries keep
+        the stored field names, e.g. `_id`, and can be passed straight to
+        handle_result
+        """
+        if fields:
+            query_set = query_set.only(*fields)
+        elif not raw:
+            return query_set
+        return query_set.as_pymongo()
+
+    def _record_filter(self, filter_param, sort=()):
+        """
+        Records the database fields of the query for the index advisor. Query
+        operators, e.g. `score__gt`, are stripped from the filter keys
+        """
+        if not recording_enabled():
+            return
+        db_fields = []
+        for key in [*filter_param, *sort]:
+            name = key.split("__")[0]
+            if name == "pk":
+                name = self.model._meta["id_field"]
+            field = self.model._fields.get(name)
+            db_fields.append(field.db_field if field else name)
+        record_filter(
+            "mongo",
+            self.model._get_collection_name(),
+            db_fields[: len(filter_param)],
+            db_fields[len(filter_param) :],
+        )
+
+    def _cache_key(self, obj_id) -> str:
+        return f"{self.model._get_collection_name()}:{obj_id}"
+
+    def _invalidate_cache(self, *obj_ids):
+        if self.cache is not None:
+            self.cache.delete(*[self._cache_key(obj_id) for obj_id in obj_ids])
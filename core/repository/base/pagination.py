@@ -0,0 +1,113 @@
+import base64
+import binascii
+import hashlib
+import json
+import uuid
+from datetime import date, datetime
+from decimal import InvalidOperation
+
+from ...exceptions.app_exceptions import AppException
+
+
+class Page:
+    """
+    A single page of a keyset paginated listing. `next_cursor` is None when
+    there are no more records after this page
+    """
+
+    __slots__ = ["items", "next_cursor"]
+
+    def __init__(self, items, next_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+
+
+def page_size(limit, default_page_size, max_page_size) -> int:
+    """
+    Validate the page size requested and cap it at max_page_size
+    :param limit: page size requested, None for the default page size
+    :return: {int}
+    """
+    if limit is None:
+        return default_page_size
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise AppException.BadRequest("Page size should be an integer")
+    if limit < 1:
+        raise AppException.BadRequest("Page size should be greater than zero")
+    return min(limit, max_page_size)
+
+
+def encode_cursor(values) -> str:
+    """
+    Encode the keyset values of the last item of a page into an opaque cursor
+    :param values: {list} values of the ordering columns
+    :return: {str} url safe cursor
+    """
+    serialized = [
+        value.isoformat() if isinstance(value, (date, datetime)) else value
+        for value in values
+    ]
+    raw = json.dumps(serialized, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def version_tag(name, count, last_modified) -> str:
+    """
+    Builds an opaque ETag value from the number of records of a listing and
+    their last modification date
+    """
+    raw = f"{name}:{count}:{last_modified.isoformat() if last_modified else ''}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def decode_cursor(cursor: str, python_types=None) -> list:
+    """
+    Decode a cursor produced by `encode_cursor`
+    :param cursor: {str} the cursor sent back by the client
+    :param python_types: {list} python types of the ordering columns, every
+    value is converted to the type of its column, e.g. dates that were
+    serialized as iso strings
+    :raises BadRequest: the cursor was not produced by `encode_cursor` for
+    these columns
+    :return: {list} values of the ordering columns
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        raise AppException.BadRequest("Invalid pagination cursor")
+
+    if not isinstance(values, list):
+        raise AppException.BadRequest("Invalid pagination cursor")
+    if python_types is None:
+        return values
+    if len(values) != len(python_types):
+        raise AppException.BadRequest("Invalid pagination cursor")
+
+    try:
+        return [
+            _restore(value, python_type)
+            for value, python_type in zip(values, python_types)
+        ]
+    except (TypeError, ValueError, AttributeError, InvalidOperation):
+        raise AppException.BadRequest("Invalid pagination cursor")
+
+
+def _restore(value, python_type):
+    """
+    Converts a cursor value back to the python type of its column, None when
+    the type is unknown
+    """
+    if value is None or isinstance(value, (dict, list)):
+        raise ValueError("Cursor values should be scalars")
+    if python_type is None:
+        return value
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    if python_type in (int, float) and isinstance(value, bool):
+        raise ValueError("Cursor value should be a number")
+    return python_type(value)
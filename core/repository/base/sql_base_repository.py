@@ -1,14 +1,65 @@
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import (
+    and_,
+    bindparam,
+    delete,
+    func,
+    inspect,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.exc import IntegrityError, DBAPIError
+from sqlalchemy.orm import Load, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from ...cache import CacheBackend, LRUCache
 from ...extensions import db
 
 from ...exceptions.app_exceptions import AppException
+from ...index_advisor import record_filter, recording_enabled
 from ...repository.base.crud_repository_interface import (
     CRUDRepositoryInterface,
 )
+from ...routing import RoutingSession
+from ..unit_of_work import in_unit_of_work, invalidate_on_exit
+from .pagination import Page, decode_cursor, encode_cursor, page_size, version_tag
+from .statement_cache import StatementCache, default_statement_cache
 
 
 class SQLBaseRepository(CRUDRepositoryInterface):
     model: db.Model
+    # column used to order paginated listings. It should be indexed and not
+    # nullable. The primary key is used as a tie breaker for other columns
+    pagination_column: str = None
+    default_page_size: int = 20
+    max_page_size: int = 100
+    # number of rows fetched per round-trip by iter_all and iter_filtered
+    chunk_size: int = 1000
+    # send update_by_id and delete as a single UPDATE/DELETE ... RETURNING
+    # statement instead of loading the object first. These are Core statements:
+    # ORM relationship cascades and ORM events (e.g. before_update) do not run
+    single_statement_writes: bool = False
+    # read-through cache used by find_by_id, e.g. LRUCache() or RedisCache()
+    cache: CacheBackend = None
+    # relationships loaded along with list queries, mapped to the loading
+    # strategy, e.g. {"employees": "selectin", "employees.tokens": "selectin"}.
+    # Can be overridden per call with the eager_load argument
+    eager_load: dict = None
+    # attributes of the unique constraint upsert resolves conflicts on,
+    # defaults to the primary key. e.g. ("email_address",)
+    upsert_conflict_target: tuple = None
+    # select() statements built by find and find_all, shared by all
+    # repositories. statement_cache.stats reports its size and hit rate
+    statement_cache: StatementCache = default_statement_cache
+    # exact counts are kept for a few seconds per filter, set to None to
+    # always count
+    count_cache: CacheBackend = LRUCache(maxsize=1024, ttl=5)
+    # column holding the last modification date of a row, used by version()
+    modified_column: str = "modified"
 
     def __init__(self):
         """
@@ -20,13 +71,18 @@ class SQLBaseRepository(CRUDRepositoryInterface):
 
         self.db = db
 
-    def index(self) -> [db.Model]:
+    def index(self, fields=None, eager_load=None) -> [db.Model]:
         """
 
+        :param fields: {list} optional column names to load. When passed, rows
+        holding only these columns are returned instead of model objects
+        :param eager_load: {dict} relationships to load with the objects,
+        defaults to the eager_load class attribute
         :return: {list} returns a list of objects of type model
         """
         try:
-            data = self.model.query.all()
+            with self._read_replica():
+                data = self._query(fields, eager_load).all()
             return data
 
         except DBAPIError as e:
@@ -44,7 +100,8 @@ class SQLBaseRepository(CRUDRepositoryInterface):
             obj_data = dict(obj_in)
             db_obj = self.model(**obj_data)
             self.db.session.add(db_obj)
-            self.db.session.commit()
+            self._commit()
+            self._invalidate_cache(obj_data.get(self._primary_key().key))
             return db_obj
         except IntegrityError as e:
             raise AppException.OperationError(e.orig.args[0])
@@ -60,7 +117,10 @@ class SQLBaseRepository(CRUDRepositoryInterface):
         assert obj_in, "Missing update data"
         assert isinstance(obj_in, dict), "Update data should be a dictionary"
 
-        db_obj = self.find_by_id(obj_id)
+        if self.single_statement_writes:
+            return self._update_returning(obj_id, obj_in)
+
+        db_obj = self._find_by_id(obj_id)
         if not db_obj:
             raise AppException.NotFoundException(
                 f"Resource of id {obj_id} does not exist"
@@ -70,7 +130,8 @@ class SQLBaseRepository(CRUDRepositoryInterface):
                 if hasattr(db_obj, field):
                     setattr(db_obj, field, obj_in[field])
             self.db.session.add(db_obj)
-            self.db.session.commit()
+            self._commit()
+            self._invalidate_cache(obj_id)
             return db_obj
         except DBAPIError as e:
             raise AppException.OperationError(e.orig.args[0])
@@ -83,43 +144,71 @@ class SQLBaseRepository(CRUDRepositoryInterface):
         """
         assert obj_id, "Missing id of object for querying"
 
+        with self._read_replica():
+            return self._find_by_id(obj_id)
+
+    def _find_by_id(self, obj_id) -> db.Model:
+        # the object already held by the session keeps its unsaved changes,
+        # the cached values must not overwrite them
+        identity_key = inspect(self.model).identity_key_from_primary_key([obj_id])
+        db_obj = self.db.session.identity_map.get(identity_key)
+        if db_obj is not None:
+            return db_obj
+
+        if self.cache is not None:
+            values = self.cache.get(self._cache_key(obj_id))
+            if values is not None:
+                return self._instance_from_values(values)
+
         try:
             db_obj = self.model.query.get(obj_id)
             if db_obj is None:
                 raise AppException.NotFoundException()
+            if self.cache is not None:
+                self.cache.set(self._cache_key(obj_id), self._column_values(db_obj))
             return db_obj
 
         except DBAPIError as e:
             raise AppException.OperationError(e.orig.args[0])
 
-    def find(self, filter_param: dict) -> db.Model:
+    def find(self, filter_param: dict, fields=None, eager_load=None) -> db.Model:
         """
         This method returns the first object that matches the query parameters specified
         :param filter_param {dict}. Parameters to be filtered by
+        :param fields {list}. Optional column names to load, a row holding only
+        these columns is returned instead of a model object
+        :param eager_load {dict}. Relationships to load with the object
         """
         assert filter_param, "Missing filter parameters"
         assert isinstance(
             filter_param, dict
         ), "Filter parameters should be of type dictionary"
 
+        self._record_filter(filter_param)
         try:
-            db_obj = self.model.query.filter_by(**filter_param).first()
+            with self._read_replica():
+                db_obj = self._select(filter_param, fields, eager_load, limit=1).first()
             return db_obj
         except DBAPIError as e:
             raise AppException.OperationError(e.orig.args[0])
 
-    def find_all(self, filter_param) -> db.Model:
+    def find_all(self, filter_param, fields=None, eager_load=None) -> db.Model:
         """
         This method returns all objects that matches the query
         parameters specified
+        :param fields {list}. Optional column names to load, rows holding only
+        these columns are returned instead of model objects
+        :param eager_load {dict}. Relationships to load with the objects
         """
         assert filter_param, "Missing filter parameters"
         assert isinstance(
             filter_param, dict
         ), "Filter parameters should be of type dictionary"
 
+        self._record_filter(filter_param)
         try:
-            db_obj = self.model.query.filter_by(**filter_param).all()
+            with self._read_replica():
+                db_obj = self._select(filter_param, fields, eager_load).all()
             return db_obj
 
         except DBAPIError as e:
@@ -132,12 +221,769 @@ class SQLBaseRepository(CRUDRepositoryInterface):
         :return:
         """
 
-        db_obj = self.find_by_id(obj_id)
+        if self.single_statement_writes:
+            return self._delete_returning(obj_id)
+
+        db_obj = self._find_by_id(obj_id)
         try:
             if not db_obj:
                 raise AppException.NotFoundException()
             db.session.delete(db_obj)
-            db.session.commit()
+            self._commit()
+            self._invalidate_cache(obj_id)
+
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+
+    def _loader_options(self, plan) -> list:
+        """
+        Builds the loader options of an eager load plan. Nested relationships
+        are separated by dots, e.g. "employees.tokens"
+        :param plan: {dict} relationship paths mapped to "selectin" or "joined"
+        """
+        options = []
+        for path, strategy in plan.items():
+            assert strategy in ("selectin", "joined"), f"Unknown strategy {strategy}"
+            *parents, name = path.split(".")
+            loader = Load(self.model)
+            entity = self.model
+            for parent in parents:
+                relationship = getattr(entity, parent)
+                loader = loader.defaultload(relationship)
+                entity = relationship.property.mapper.class_
+            options.append(getattr(loader, f"{strategy}load")(getattr(entity, name)))
+        return options
+
+    def _read_replica(self):
+        """
+        Routes the reads made inside the block to a read replica when replicas
+        are configured, see RoutingSession
+        """
+        session = self.db.session()
+        if isinstance(session, RoutingSession):
+            return session.replica_reads()
+        return nullcontext()
+
+    def _query(self, fields=None, eager_load=None):
+        """
+        Returns a query on the model with the eager load plan applied, or on
+        the columns passed when fields are specified so that no model object is
+        built per row
+        """
+        if not fields:
+            plan = self.eager_load if eager_load is None else eager_load
+            if not plan:
+                return self.model.query
+            return self.model.query.options(*self._loader_options(plan))
+        return self.db.session.query(*self._columns(fields))
+
+    def _columns(self, fields) -> list:
+        column_attributes = inspect(self.model).column_attrs
+        unknown_fields = [field for field in fields if field not in column_attributes]
+        if unknown_fields:
+            raise AppException.BadRequest(f"Unknown fields {unknown_fields}")
+        return [getattr(self.model, field) for field in fields]
+
+    def _select(self, filter_param, fields=None, eager_load=None, limit=None):
+        """
+        Runs a select of the rows matching filter_param. The statement is taken
+        from the statement cache, keyed by model, filter keys, fields and eager
+        load plan, so only the parameters change between calls. Filters on
+        attributes that are not columns fall back to Query.filter_by
+        :return: a result, or a query, supporting first() and all()
+        """
+        column_attributes = inspect(self.model).column_attrs
+        if any(key not in column_attributes for key in filter_param):
+            query = self._query(fields, eager_load).filter_by(**filter_param)
+            return query.limit(limit) if limit else query
+
+        plan = None
+        if not fields:
+            plan = self.eager_load if eager_load is None else eager_load
+        key = (
+            self.model,
+            tuple(fields or ()),
+            tuple(sorted((plan or {}).items())),
+            tuple(
+                sorted((field, value is None) for field, value in filter_param.items())
+            ),
+            limit,
+        )
+        statement = self.statement_cache.get(
+            key, lambda: self._build_select(filter_param, fields, plan, limit)
+        )
+        result = self.db.session.execute(
+            statement,
+            {
+                f"filter_{field}": value
+                for field, value in filter_param.items()
+                if value is not None
+            },
+        )
+        if fields:
+            return result
+        if plan and "joined" in plan.values():
+            return result.scalars().unique()
+        return result.scalars()
+
+    def _build_select(self, filter_param, fields, plan, limit):
+        if fields:
+            statement = select(*self._columns(fields))
+        else:
+            statement = select(self.model)
+            if plan:
+                statement = statement.options(*self._loader_options(plan))
+
+        for field, value in filter_param.items():
+            column = getattr(self.model, field)
+            if value is None:
+                statement = statement.where(column.is_(None))
+            else:
+                statement = statement.where(column == bindparam(f"filter_{field}"))
+        return statement.limit(limit) if limit else statement
+
+    def _update_returning(self, obj_id, obj_in) -> db.Model:
+        """
+        Updates an object with one UPDATE ... RETURNING statement and attaches
+        the returned row to the session without another query. Falls back to
+        a plain UPDATE followed by a lookup on dialects without RETURNING
+        """
+        update_data = self._column_data(obj_in)
+        if not update_data:
+            # nothing to set, keys that are not columns are ignored like in
+            # the default update path
+            db_obj = self._find_by_id(obj_id)
+            if not db_obj:
+                raise AppException.NotFoundException(
+                    f"Resource of id {obj_id} does not exist"
+                )
+            return db_obj
+
+        table = self.model.__table__
+        statement = (
+            update(table).where(self._primary_key() == obj_id).values(update_data)
+        )
+        returning = self._supports_returning()
+        if returning:
+            statement = statement.returning(*table.columns)
+
+        try:
+            result = self.db.session.execute(statement)
+            row = result.first() if returning else None
+            updated = row is not None if returning else result.rowcount > 0
+            if not updated:
+                raise AppException.NotFoundException(
+                    f"Resource of id {obj_id} does not exist"
+                )
+            self._commit()
+            self._invalidate_cache(obj_id)
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+
+        if not returning:
+            return self._find_by_id(obj_id)
+        mapper = inspect(self.model)
+        return self._instance_from_values(
+            {
+                mapper.get_property_by_column(column).key: value
+                for column, value in zip(table.columns, row)
+            }
+        )
+
+    def _delete_returning(self, obj_id):
+        """
+        Deletes an object with one DELETE ... RETURNING statement without
+        loading it first
+        """
+        primary_key = self._primary_key()
+        statement = delete(self.model.__table__).where(primary_key == obj_id)
+        returning = self._supports_returning()
+        if returning:
+            statement = statement.returning(primary_key)
+
+        try:
+            result = self.db.session.execute(statement)
+            row = result.first() if returning else None
+            deleted = row is not None if returning else result.rowcount > 0
+            if not deleted:
+                raise AppException.NotFoundException(
+                    f"Resource of id {obj_id} does not exist"
+                )
+            self._commit()
+            self._invalidate_cache(obj_id)
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+
+        identity_key = inspect(self.model).identity_key_from_primary_key(
+            [row[0] if returning else obj_id]
+        )
+        db_obj = self.db.session.identity_map.get(identity_key)
+        if db_obj is not None:
+            self.db.session.expunge(db_obj)
+
+    def _supports_returning(self) -> bool:
+        dialect = self.db.session().get_bind(inspect(self.model)).dialect
+        return getattr(dialect, "full_returning", False)
+
+    def _instance_from_values(self, values) -> db.Model:
+        """
+        Builds a persistent model object from column values read from the
+        database or the cache, without querying. The object replaces any copy
+        already held by the session
+        :param values: {dict} column attribute names mapped to their values
+        """
+        db_obj = inspect(self.model).class_manager.new_instance()
+        for key, value in values.items():
+            set_committed_value(db_obj, key, value)
+        make_transient_to_detached(db_obj)
+        return self.db.session.merge(db_obj, load=False)
+
+    def _column_data(self, obj_in) -> dict:
+        """
+        Maps the attributes of the data passed to column names, dropping keys
+        that are not columns of the model
+        """
+        columns = {
+            attribute.key: attribute.columns[0].name
+            for attribute in inspect(self.model).column_attrs
+        }
+        return {
+            columns[field]: value for field, value in obj_in.items() if field in columns
+        }
+
+    def _column_values(self, db_obj) -> dict:
+        return {
+            attribute.key: getattr(db_obj, attribute.key)
+            for attribute in inspect(self.model).column_attrs
+        }
+
+    def _cache_key(self, obj_id) -> str:
+        return f"{self.model.__tablename__}:{obj_id}"
+
+    def _commit(self):
+        """
+        Commits the session, or only flushes it inside a unit of work so that
+        the unit of work commits once for all the repository calls it groups
+        """
+        if in_unit_of_work(self.db.session):
+            self.db.session.flush()
+        else:
+            self.db.session.commit()
+
+    @contextmanager
+    def _bulk_write(self):
+        """
+        Runs a bulk write and commits it. Inside a unit of work the write runs
+        in a savepoint and a failure only rolls back that savepoint, keeping
+        the writes the unit of work made before it. Outside a unit of work a
+        failure rolls back the session
+        """
+        if not in_unit_of_work(self.db.session):
+            try:
+                yield
+                self.db.session.commit()
+            except DBAPIError:
+                self.db.session.rollback()
+                raise
+            return
+
+        savepoint = self.db.session.begin_nested()
+        try:
+            yield
+            self.db.session.flush()
+        except DBAPIError:
+            savepoint.rollback()
+            raise
+        savepoint.commit()
+
+    def _invalidate_cache(self, *obj_ids):
+        if self.cache is None:
+            return
+        keys = [self._cache_key(obj_id) for obj_id in obj_ids if obj_id is not None]
+        self.cache.delete(*keys)
+        if in_unit_of_work(self.db.session):
+            invalidate_on_exit(self.db.session, self.cache, keys)
+
+    def create_many(self, objs_in) -> int:
+        """
+        Inserts all the records passed in a single transaction. Records are sent
+        to the database with executemany instead of one statement per record
+        :param objs_in: {list} the data you want to use to create the models
+        :return: {int} number of records created
+        """
+        assert objs_in, "Missing data to be saved"
+
+        rows = [dict(obj_in) for obj_in in objs_in]
+        try:
+            with self._bulk_write():
+                self.db.session.bulk_insert_mappings(self.model, rows)
+            return len(rows)
+        except DBAPIError:
+            statements = [
+                (
+                    {"index": index},
+                    lambda row=row: self.db.session.bulk_insert_mappings(
+                        self.model, [row]
+                    ),
+                )
+                for index, row in enumerate(rows)
+            ]
+            raise AppException.OperationError(self._row_errors(statements))
+
+    def update_many(self, obj_ids, obj_in) -> int:
+        """
+        Updates all objects matching the ids passed with a single
+        UPDATE ... WHERE id IN statement
+        :param obj_ids: {list} ids of objects to update
+        :param obj_in: {dict} update data applied to every object
+        :return: {int} number of records updated
+        """
+        assert obj_ids, "Missing ids of objects to update"
+        assert obj_in, "Missing update data"
+        assert isinstance(obj_in, dict), "Update data should be a dictionary"
+
+        table = inspect(self.model).local_table
+        update_data = {
+            table.c[name]: value for name, value in self._column_data(obj_in).items()
+        }
+        primary_key = self._primary_key()
+        try:
+            with self._bulk_write():
+                updated = self.model.query.filter(primary_key.in_(obj_ids)).update(
+                    update_data, synchronize_session=False
+                )
+            self._invalidate_cache(*obj_ids)
+            return updated
+        except DBAPIError:
+            statements = [
+                (
+                    {"id": str(obj_id)},
+                    lambda obj_id=obj_id: self.model.query.filter(
+                        primary_key == obj_id
+                    ).update(update_data, synchronize_session=False),
+                )
+                for obj_id in obj_ids
+            ]
+            raise AppException.OperationError(self._row_errors(statements))
+
+    def delete_many(self, obj_ids) -> int:
+        """
+        Deletes all objects matching the ids passed with a single
+        DELETE ... WHERE id IN statement
+        :param obj_ids: {list} ids of objects to delete
+        :return: {int} number of records deleted
+        """
+        assert obj_ids, "Missing ids of objects to delete"
+
+        primary_key = self._primary_key()
+        try:
+            with self._bulk_write():
+                deleted = self.model.query.filter(primary_key.in_(obj_ids)).delete(
+                    synchronize_session=False
+                )
+            self._invalidate_cache(*obj_ids)
+            return deleted
+        except DBAPIError:
+            statements = [
+                (
+                    {"id": str(obj_id)},
+                    lambda obj_id=obj_id: self.model.query.filter(
+                        primary_key == obj_id
+                    ).delete(synchronize_session=False),
+                )
+                for obj_id in obj_ids
+            ]
+            raise AppException.OperationError(self._row_errors(statements))
+
+    def _row_errors(self, statements) -> list:
+        """
+        Re-runs every statement of a failed bulk operation in its own savepoint
+        to report which rows caused the failure. Nothing is persisted, the whole
+        bulk operation is rolled back afterwards. Inside a unit of work only the
+        savepoint the statements run in is rolled back
+        :param statements: {list} of (row reference, callable) tuples
+        :return: {list} row references with the database error of each row
+        """
+        errors = []
+        replay = None
+        if in_unit_of_work(self.db.session):
+            replay = self.db.session.begin_nested()
+        try:
+            for reference, statement in statements:
+                savepoint = self.db.session.begin_nested()
+                try:
+                    statement()
+                    savepoint.commit()
+                except DBAPIError as e:
+                    savepoint.rollback()
+                    errors.append({**reference, "error": e.orig.args[0]})
+        finally:
+            if replay is not None:
+                replay.rollback()
+            else:
+                self.db.session.rollback()
+        return errors
+
+    def upsert(self, obj_in, conflict_target=None) -> db.Model:
+        """
+        Inserts an object, or updates the existing row that conflicts with it
+        on the conflict target, with a single INSERT ... ON CONFLICT DO UPDATE
+        statement
+        :param obj_in: {dict} the data you want to use to create or update the model
+        :param conflict_target: {tuple} attributes of a unique constraint,
+        defaults to upsert_conflict_target
+        :return: model_object - Returns an instance object of the model passed
+        """
+        assert obj_in, "Missing data to be saved"
+
+        row = self._column_data(dict(obj_in))
+        target = self._conflict_columns(conflict_target)
+        assert all(column.name in row for column in target), "Missing conflict values"
+        returning = self._supports_returning()
+        statement = self._upsert_statement(row.keys(), target).values(row)
+        if returning:
+            statement = statement.returning(*self.model.__table__.columns)
+
+        try:
+            result = self.db.session.execute(statement)
+            returned_row = result.first() if returning else None
+            self._commit()
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+
+        if returned_row is not None:
+            mapper = inspect(self.model)
+            db_obj = self._instance_from_values(
+                {
+                    mapper.get_property_by_column(column).key: value
+                    for column, value in zip(self.model.__table__.columns, returned_row)
+                }
+            )
+        else:
+            db_obj = self.model.query.filter(
+                *[column == row[column.name] for column in target]
+            ).one()
+        self._invalidate_cache(inspect(db_obj).identity[0])
+        return db_obj
+
+    def upsert_many(self, objs_in, conflict_target=None) -> int:
+        """
+        Inserts or updates all the records passed in a single transaction with
+        INSERT ... ON CONFLICT DO UPDATE statements sent with executemany
+        :param objs_in: {list} the data you want to use to create or update the models
+        :param conflict_target: {tuple} attributes of a unique constraint,
+        defaults to upsert_conflict_target
+        :return: {int} number of records written
+        """
+        assert objs_in, "Missing data to be saved"
+
+        rows = [self._column_data(dict(obj_in)) for obj_in in objs_in]
+        target = self._conflict_columns(conflict_target)
+        assert all(
+            column.name in row for row in rows for column in target
+        ), "Missing conflict values"
+        statements = {}
+        for row in rows:
+            keys = tuple(sorted(row))
+            if keys not in statements:
+                statements[keys] = self._upsert_statement(keys, target)
+
+        try:
+            with self._bulk_write():
+                for keys, statement in statements.items():
+                    self.db.session.execute(
+                        statement, [row for row in rows if tuple(sorted(row)) == keys]
+                    )
+        except DBAPIError:
+            raise AppException.OperationError(
+                self._row_errors(
+                    [
+                        (
+                            {"index": index},
+                            lambda row=row: self.db.session.execute(
+                                statements[tuple(sorted(row))], [row]
+                            ),
+                        )
+                        for index, row in enumerate(rows)
+                    ]
+                )
+            )
+
+        if self.cache is not None:
+            conflict_values = [
+                tuple(row[column.name] for column in target) for row in rows
+            ]
+            written = self.db.session.query(self._primary_key()).filter(
+                tuple_(*target).in_(conflict_values)
+            )
+            self._invalidate_cache(*[obj_id for (obj_id,) in written])
+        return len(rows)
 
+    def _conflict_columns(self, conflict_target) -> list:
+        target = conflict_target or self.upsert_conflict_target
+        if not target:
+            return list(inspect(self.model).primary_key)
+        return [getattr(self.model, field).property.columns[0] for field in target]
+
+    def _upsert_statement(self, keys, target):
+        """
+        Builds the INSERT ... ON CONFLICT DO UPDATE statement for rows holding
+        the column names passed. Columns with both a default and an onupdate
+        default, such as modified dates, are refreshed on conflict as well
+        """
+        dialect = self.db.session().get_bind(inspect(self.model)).dialect.name
+        if dialect == "postgresql":
+            insert = postgresql.insert
+        elif dialect == "sqlite":
+            insert = sqlite.insert
+        else:
+            raise AppException.OperationError(f"Upsert is not supported on {dialect}")
+
+        statement = insert(self.model.__table__)
+        target_names = {column.name for column in target}
+        update_columns = {
+            column.name
+            for column in self.model.__table__.columns
+            if column.name in keys
+            or (column.onupdate is not None and column.default is not None)
+        }
+        update_columns -= target_names
+        update_columns -= {column.name for column in inspect(self.model).primary_key}
+        if not update_columns:
+            return statement.on_conflict_do_nothing(index_elements=target)
+        return statement.on_conflict_do_update(
+            index_elements=target,
+            set_={name: statement.excluded[name] for name in update_columns},
+        )
+
+    def iter_all(self, chunk_size=None, eager_load=None):
+        """
+        Streams every object of the model using a server side cursor, so only
+        chunk_size rows are held in memory at a time
+        :param chunk_size: {int} rows fetched per round-trip
+        :param eager_load: {dict} relationships to load with the objects. Joined
+        loading can not be combined with streaming, relationships are selectin
+        loaded instead
+        :return: {generator} objects of type model
+        """
+        return self._stream(self._streaming_query(eager_load), chunk_size)
+
+    def iter_filtered(self, filter_param, chunk_size=None, eager_load=None):
+        """
+        Streams every object matching the query parameters specified using a
+        server side cursor
+        :param filter_param: {dict} parameters to be filtered by
+        :param chunk_size: {int} rows fetched per round-trip
+        :param eager_load: {dict} relationships to load with the objects. Joined
+        loading can not be combined with streaming, relationships are selectin
+        loaded instead
+        :return: {generator} objects of type model
+        """
+        assert filter_param, "Missing filter parameters"
+        assert isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+
+        self._record_filter(filter_param)
+        return self._stream(
+            self._streaming_query(eager_load).filter_by(**filter_param), chunk_size
+        )
+
+    def _streaming_query(self, eager_load=None):
+        """
+        Returns a query on the model with the eager load plan applied, joined
+        loading replaced by selectin loading. yield_per can not be combined
+        with joined loading of collections, which needs the whole result to
+        de-duplicate the rows
+        """
+        plan = self.eager_load if eager_load is None else eager_load
+        return self._query(eager_load={path: "selectin" for path in plan or {}})
+
+    def _stream(self, query, chunk_size):
+        try:
+            yield from query.execution_options(stream_results=True).yield_per(
+                chunk_size or self.chunk_size
+            )
         except DBAPIError as e:
             raise AppException.OperationError(e.orig.args[0])
+
+    def count(self, filter_param=None, estimated=False) -> int:
+        """
+        Returns the number of objects matching the query parameters specified.
+        Exact counts are cached for a short time in count_cache
+        :param filter_param: {dict} optional parameters to be filtered by
+        :param estimated: {bool} on PostgreSQL, return the planner estimate
+        kept in pg_class.reltuples instead of scanning the table. Only used
+        when there are no filter parameters
+        :return: {int}
+        """
+        assert filter_param is None or isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+
+        filter_param = filter_param or {}
+        self._record_filter(filter_param)
+        key = f"{self.model.__tablename__}:count:{sorted(filter_param.items())!r}"
+        try:
+            with self._read_replica():
+                if estimated and not filter_param:
+                    estimate = self._estimated_count()
+                    if estimate is not None:
+                        return estimate
+
+                if self.count_cache is not None:
+                    count = self.count_cache.get(key)
+                    if count is not None:
+                        return count
+
+                statement = (
+                    select(func.count())
+                    .select_from(self.model)
+                    .filter_by(**filter_param)
+                )
+                count = self.db.session.execute(statement).scalar()
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+
+        if self.count_cache is not None:
+            self.count_cache.set(key, count)
+        return count
+
+    def version(self, filter_param=None) -> tuple:
+        """
+        Returns a version tag of the objects matching the query parameters
+        specified and their last modification date, read with a single
+        aggregate query. The tag changes whenever a matching object is
+        created, updated or deleted, so it can be passed to handle_result as
+        etag to answer unchanged listings with 304 Not Modified
+        :param filter_param: {dict} optional parameters to be filtered by
+        :return: {tuple} (version tag, last modified datetime or None)
+        """
+        assert filter_param is None or isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+        assert hasattr(
+            self.model, self.modified_column
+        ), f"{self.model.__name__} has no {self.modified_column} column"
+
+        statement = select(
+            func.count(), func.max(getattr(self.model, self.modified_column))
+        ).select_from(self.model)
+        if filter_param:
+            statement = statement.filter_by(**filter_param)
+        try:
+            with self._read_replica():
+                count, last_modified = self.db.session.execute(statement).one()
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+        tag = version_tag(self.model.__tablename__, count, last_modified)
+        return tag, last_modified
+
+    def _estimated_count(self):
+        """
+        returns the row estimate PostgreSQL keeps for the table, or None when
+        it is not available, e.g. on other dialects or before the first ANALYZE
+        """
+        if self.db.session().get_bind(inspect(self.model)).dialect.name != "postgresql":
+            return None
+        table = self.model.__table__
+        table_name = f"{table.schema}.{table.name}" if table.schema else table.name
+        estimate = self.db.session.execute(
+            text(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = to_regclass(:table_name)"
+            ),
+            {"table_name": table_name},
+        ).scalar()
+        if estimate is None or estimate < 0:
+            return None
+        return estimate
+
+    def paginate(
+        self, filter_param=None, cursor=None, limit=None, eager_load=None
+    ) -> Page:
+        """
+        Returns a page of objects ordered by the pagination column, starting
+        after the cursor passed. Keyset pagination is used so the cost of a page
+        does not grow with the number of pages before it
+        :param filter_param: {dict} optional parameters to be filtered by
+        :param cursor: {str} next_cursor of the previous page
+        :param limit: {int} page size, capped at max_page_size
+        :param eager_load: {dict} relationships to load with the objects
+        :return: {Page} items of the page and the cursor of the next page
+        """
+        assert filter_param is None or isinstance(
+            filter_param, dict
+        ), "Filter parameters should be of type dictionary"
+
+        limit = page_size(limit, self.default_page_size, self.max_page_size)
+        order_columns = self._pagination_columns()
+        self._record_filter(filter_param or {}, order_columns)
+
+        try:
+            query = self._query(eager_load=eager_load)
+            if filter_param:
+                query = query.filter_by(**filter_param)
+            if cursor:
+                values = decode_cursor(
+                    cursor, [self._python_type(column) for column in order_columns]
+                )
+                query = query.filter(self._keyset_clause(order_columns, values))
+            with self._read_replica():
+                rows = query.order_by(*order_columns).limit(limit + 1).all()
+        except DBAPIError as e:
+            raise AppException.OperationError(e.orig.args[0])
+
+        items = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = encode_cursor(
+                [getattr(items[-1], column.key) for column in order_columns]
+            )
+        return Page(items, next_cursor)
+
+    def _record_filter(self, filter_param, order_columns=()):
+        """
+        Records the columns of the query for the index advisor
+        """
+        if not recording_enabled():
+            return
+        column_attributes = inspect(self.model).column_attrs
+        record_filter(
+            "sql",
+            self.model.__tablename__,
+            [
+                column_attributes[key].columns[0].name
+                if key in column_attributes
+                else key
+                for key in filter_param
+            ],
+            [column.property.columns[0].name for column in order_columns],
+        )
+
+    def _primary_key(self):
+        primary_key = inspect(self.model).primary_key[0]
+        return getattr(self.model, primary_key.key)
+
+    def _pagination_columns(self):
+        primary_key = self._primary_key()
+        if not self.pagination_column or self.pagination_column == primary_key.key:
+            return [primary_key]
+        return [getattr(self.model, self.pagination_column), primary_key]
+
+    @staticmethod
+    def _python_type(column):
+        try:
+            return column.type.python_type
+        except NotImplementedError:
+            return None
+
+    @staticmethod
+    def _keyset_clause(order_columns, values):
+        if len(order_columns) == 1:
+            return order_columns[0] > values[0]
+        column, tie_breaker = order_columns
+        value, tie_breaker_value = values
+        return or_(
+            column > value, and_(column == value, tie_breaker > tie_breaker_value)
+        )
@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+
+
+class StatementCache:
+    """
+    Keeps the select() statements built for each model and filter shape, with
+    bound parameters in place of the filter values. A statement is therefore
+    built once per shape and every later call hits SQLAlchemy's compiled cache
+    instead of building and compiling a new query
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        returns the statement cached for the key, building it with the
+        callable passed on a miss
+        :param key: hashable description of the statement shape
+        :param build: {callable} returns the statement
+        """
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is not None:
+                self._statements.move_to_end(key)
+                self.hits += 1
+                return statement
+            self.misses += 1
+
+        statement = build()
+        with self._lock:
+            self._statements[key] = statement
+            while len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+        return statement
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._statements),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+default_statement_cache = StatementCache()
@@ -0,0 +1,46 @@
+from contextlib import contextmanager
+
+from ..extensions import db
+
+_DEPTH_KEY = "unit_of_work_depth"
+_INVALIDATIONS_KEY = "unit_of_work_invalidations"
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Groups the writes of several repository calls in a single transaction.
+    Inside the block repository writes only flush, the transaction is committed
+    once when the outermost block exits and rolled back if an exception is
+    raised. Can also be used as a decorator, @unit_of_work()
+
+    :return: the session used by the repositories
+    """
+    session = db.session()
+    depth = session.info.get(_DEPTH_KEY, 0)
+    session.info[_DEPTH_KEY] = depth + 1
+    try:
+        yield session
+        if depth == 0:
+            session.commit()
+    except BaseException:
+        if depth == 0:
+            session.rollback()
+        raise
+    finally:
+        session.info[_DEPTH_KEY] = depth
+        if depth == 0:
+            for cache, keys in session.info.pop(_INVALIDATIONS_KEY, []):
+                cache.delete(*keys)
+
+
+def in_unit_of_work(session) -> bool:
+    return session.info.get(_DEPTH_KEY, 0) > 0
+
+
+def invalidate_on_exit(session, cache, keys):
+    """
+    Removes the keys from the cache again once the unit of work ends, so a
+    value read before the commit does not outlive it
+    """
+    session.info.setdefault(_INVALIDATIONS_KEY, []).append((cache, keys))
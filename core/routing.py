@@ -0,0 +1,138 @@
+import itertools
+import time
+from contextlib import contextmanager
+
+from flask import has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy, get_state
+from sqlalchemy import orm
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends the reads made inside a replica_reads() block to one of
+    the replica binds. Writes, and every read made after the session has
+    written, go to the primary.
+
+    Configuration:
+        SQLALCHEMY_REPLICA_BINDS: keys of SQLALCHEMY_BINDS pointing at the
+        replicas of the default database, or a dict mapping each primary bind
+        key (None for the default database) to the keys of its replicas.
+        Models of a bind without replicas are always read from their primary
+        SQLALCHEMY_REPLICA_STRATEGY: "round_robin" (default) or
+        "least_connections"
+        SQLALCHEMY_STICKY_PRIMARY_SECONDS: seconds after a write during which
+        the reads of the client that wrote stay on the primary, to hide
+        replica lag from it. The client is recognized by a cookie set on the
+        response of the request that wrote, so it is pinned whichever worker
+        serves its next requests. Disabled by default
+        SQLALCHEMY_STICKY_PRIMARY_COOKIE: name of that cookie, defaults to
+        "db_primary_until"
+    """
+
+    _replica_counter = itertools.count()
+
+    def __init__(self, db, **options):
+        self._replica_reads = 0
+        self._wrote = False
+        super().__init__(db, **options)
+
+    @contextmanager
+    def replica_reads(self):
+        """
+        Route the reads made inside this block to a replica when possible
+        """
+        self._replica_reads += 1
+        try:
+            yield self
+        finally:
+            self._replica_reads -= 1
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self._record_write()
+        elif self._replica_reads and not self._pinned_to_primary():
+            replica = self._choose_replica(_bind_key(mapper))
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause)
+
+    def _record_write(self):
+        self._wrote = True
+
+    def _pinned_to_primary(self) -> bool:
+        if self._wrote:
+            return True
+        if not has_request_context():
+            return False
+        pinned_until = request.cookies.get(_sticky_cookie(self.app))
+        try:
+            return pinned_until is not None and float(pinned_until) > time.time()
+        except ValueError:
+            return False
+
+    def _choose_replica(self, primary_bind_key):
+        replica_binds = self.app.config.get("SQLALCHEMY_REPLICA_BINDS")
+        if isinstance(replica_binds, dict):
+            bind_keys = replica_binds.get(primary_bind_key)
+        else:
+            bind_keys = replica_binds if primary_bind_key is None else None
+        if not bind_keys:
+            return None
+
+        db = get_state(self.app).db
+        strategy = self.app.config.get("SQLALCHEMY_REPLICA_STRATEGY", "round_robin")
+        if strategy == "least_connections":
+            engines = [db.get_engine(self.app, bind=key) for key in bind_keys]
+            return min(engines, key=_checked_out_connections)
+
+        bind_key = bind_keys[next(self._replica_counter) % len(bind_keys)]
+        return db.get_engine(self.app, bind=bind_key)
+
+
+def _bind_key(mapper):
+    """
+    returns the __bind_key__ of the mapped model, None for the default database
+    """
+    if mapper is None:
+        return None
+    return mapper.persist_selectable.info.get("bind_key")
+
+
+def _sticky_cookie(app) -> str:
+    return app.config.get("SQLALCHEMY_STICKY_PRIMARY_COOKIE", "db_primary_until")
+
+
+def _checked_out_connections(engine) -> int:
+    checked_out = getattr(engine.pool, "checkedout", None)
+    return checked_out() if checked_out else 0
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    SQLAlchemy extension whose sessions route reads to replicas, see
+    RoutingSession
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app):
+        super().init_app(app)
+
+        @app.after_request
+        def pin_writer_to_primary(response):
+            """
+            Sends the client that wrote a cookie pinning its reads to the
+            primary for SQLALCHEMY_STICKY_PRIMARY_SECONDS
+            """
+            sticky_seconds = app.config.get("SQLALCHEMY_STICKY_PRIMARY_SECONDS", 0)
+            if not sticky_seconds or not self.session.registry.has():
+                return response
+            if self.session()._wrote:
+                response.set_cookie(
+                    _sticky_cookie(app),
+                    str(time.time() + sticky_seconds),
+                    max_age=sticky_seconds,
+                    httponly=True,
+                )
+            return response
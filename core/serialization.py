@@ -0,0 +1,181 @@
+import itertools
+import threading
+import weakref
+
+from flask import current_app, has_app_context, json
+from marshmallow import Schema, fields, missing
+
+from .utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_schemas = {}
+_dumpers = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_schema(schema, many=False) -> Schema:
+    """
+    returns a shared instance of the schema class passed. Schemas hold no
+    state between dumps, so one instance per (schema, many) is built instead
+    of one per response. Schema instances are returned as they are
+
+    :param schema: {type} marshmallow schema class
+    :param many: {bool}
+    """
+    if isinstance(schema, Schema):
+        return schema
+
+    key = (schema, many)
+    instance = _schemas.get(key)
+    if instance is None:
+        with _lock:
+            instance = _schemas.setdefault(key, schema(many=many))
+    return instance
+
+
+def dump(schema: Schema, obj, many=None):
+    """
+    Same output as schema.dump(obj). The attribute and data key of every field
+    are resolved once per schema instead of once per value, and values are
+    read with a plain getattr or dict lookup. Schemas with pre/post dump
+    hooks or a custom get_attribute are dumped by marshmallow
+
+    :param schema: {Schema} instance, see get_schema
+    :param obj: object, dictionary or list of them
+    :param many: {bool} defaults to schema.many
+    """
+    many = schema.many if many is None else many
+    dumper = _dumper(schema)
+    if dumper is None:
+        return schema.dump(obj, many=many)
+    if many:
+        return [dumper(item) for item in obj]
+    return dumper(obj)
+
+
+def _dumper(schema):
+    try:
+        return _dumpers[schema]
+    except KeyError:
+        pass
+
+    dumper = None
+    if not schema._hooks and type(schema).get_attribute is Schema.get_attribute:
+        dumper = _build_dumper(schema)
+    with _lock:
+        _dumpers[schema] = dumper
+    return dumper
+
+
+def _build_dumper(schema):
+    dict_class = schema.dict_class
+    accessors = []
+    for attr_name, field in schema.dump_fields.items():
+        key = field.data_key if field.data_key is not None else attr_name
+        attribute = field.attribute or attr_name
+        simple = (
+            field._CHECK_ATTRIBUTE
+            and "." not in attribute
+            and type(field).get_value is fields.Field.get_value
+        )
+        accessors.append((key, attr_name, attribute, field, simple))
+
+    def dump_one(obj):
+        ret = dict_class()
+        is_dict = isinstance(obj, dict)
+        for key, attr_name, attribute, field, simple in accessors:
+            if not simple:
+                value = field.serialize(attr_name, obj, accessor=schema.get_attribute)
+                if value is not missing:
+                    ret[key] = value
+                continue
+
+            if is_dict:
+                value = obj.get(attribute, missing)
+            else:
+                value = getattr(obj, attribute, missing)
+            if value is missing:
+                default = field.dump_default
+                value = default() if callable(default) else default
+                if value is missing:
+                    continue
+            ret[key] = field._serialize(value, attr_name, obj)
+        return ret
+
+    return dump_one
+
+
+def _flask_dumps(obj) -> str:
+    return json.dumps(obj, cls=JSONEncoder)
+
+
+def _orjson_dumps(obj) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS
+    # sort keys like flask's json.dumps does unless JSON_SORT_KEYS is disabled
+    if not has_app_context() or current_app.config.get("JSON_SORT_KEYS", True):
+        option |= orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=_encoder.default, option=option)
+
+
+_encoder = JSONEncoder()
+_json_backends = {"flask": _flask_dumps}
+if orjson is not None:
+    _json_backends["orjson"] = _orjson_dumps
+
+
+def register_json_backend(name, dumps):
+    """
+    Makes a JSON backend available to JSON_BACKEND
+    :param name: {str}
+    :param dumps: {callable} serializes an object to a str or bytes
+    """
+    _json_backends[name] = dumps
+
+
+def json_dumps(obj):
+    """
+    Serializes obj with the backend named by JSON_BACKEND: "flask" (default),
+    "orjson" or "auto", which uses orjson when it is installed and flask
+    otherwise. Every backend encodes the types of the encoder registry in
+    core.utils.encoders the same way, e.g. ObjectId, UUID and datetime, and
+    sorts keys when JSON_SORT_KEYS is set
+    """
+    name = "flask"
+    if has_app_context():
+        name = current_app.config.get("JSON_BACKEND", "flask")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "flask"
+    dumps = _json_backends.get(name)
+    if dumps is None:
+        raise ValueError(f"Unknown JSON backend {name}")
+    return dumps(obj)
+
+
+def iter_json_array(items, schema=None, batch_size=100):
+    """
+    Yields the JSON array of the items passed in chunks, serializing
+    batch_size items at a time. The output is the same as json_dumps of the
+    whole list, without holding the list or its JSON in memory
+
+    :param items: {iterable} e.g. a repository iter_all() generator
+    :param schema: {type} optional marshmallow schema class
+    :param batch_size: {int} items serialized per chunk
+    """
+    many_schema = get_schema(schema, True) if schema else None
+    iterator = iter(items)
+    yield "["
+    first = True
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            break
+        chunk = json_dumps(dump(many_schema, batch) if many_schema else batch)
+        if not first:
+            yield ","
+        yield chunk[1:-1]
+        first = False
+    yield "]"
@@ -1,16 +1,67 @@
-from flask import Response, json
+from flask import Response, request, stream_with_context
+from werkzeug.http import is_resource_modified
 
+from .serialization import dump, get_schema, iter_json_array, json_dumps
 
-def handle_result(result, schema=None, many=False):
-    if schema:
-        return Response(
-            schema(many=many).dumps(result.value),
+
+def handle_result(
+    result, schema=None, many=False, stream=False, etag=None, last_modified=None
+):
+    """
+    Builds the JSON response of a service result
+    :param result: {Result}
+    :param schema: {type} optional marshmallow schema class
+    :param many: {bool} result.value is a list of objects
+    :param stream: {bool} with many, send the JSON array in chunks while
+    result.value, a list or a generator such as a repository iter_all(), is
+    consumed. The response uses chunked transfer encoding
+    :param etag: {str} version tag of the result, e.g. from a repository
+    version(). A GET matching it with If-None-Match is answered with 304
+    before anything is serialized. Pass True to tag the response with a hash
+    of its body instead, which saves bandwidth but not serialization
+    :param last_modified: {datetime} last modification of the result, checked
+    against If-Modified-Since before anything is serialized
+    """
+    version_tag = etag if isinstance(etag, str) else None
+    if (version_tag or last_modified) and not _is_modified(version_tag, last_modified):
+        response = Response(status=304)
+        _set_validators(response, version_tag, last_modified)
+        return response
+
+    if stream and many:
+        response = Response(
+            stream_with_context(iter_json_array(result.value, schema)),
+            status=result.status_code,
+            mimetype="application/json",
+        )
+    elif schema:
+        response = Response(
+            json_dumps(dump(get_schema(schema, many), result.value)),
             status=result.status_code,
             mimetype="application/json",
         )
     else:
-        return Response(
-            json.dumps(result.value),
+        response = Response(
+            json_dumps(result.value),
             status=result.status_code,
             mimetype="application/json",
         )
+
+    _set_validators(response, version_tag, last_modified)
+    if etag is True and not response.is_streamed:
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
+
+def _is_modified(etag, last_modified) -> bool:
+    if request.method not in ("GET", "HEAD"):
+        return True
+    return is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def _set_validators(response, etag, last_modified):
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
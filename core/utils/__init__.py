@@ -1,5 +1,5 @@
 from .encoders import JSONEncoder
-from .validator import validator
+from .validator import validator, load_data
 from .guid import GUID
 from .auth import auth_role
 from .structure import docs
@@ -1,12 +1,20 @@
+import hashlib
 import os
+import time
 
 import jwt
 import inspect
-from functools import wraps
+from functools import lru_cache, wraps
 from flask import request
 from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, PyJWTError
 
+from ..cache import LRUCache
 from ..exceptions import AppException
+from .jwks import jwks_provider
+
+# payloads of verified tokens keyed by the sha256 of the token. Entries expire
+# with the token, at most ttl seconds after they were verified
+token_cache = LRUCache(maxsize=4096, ttl=300)
 
 
 def auth_role(other_roles=None):
@@ -16,6 +24,15 @@ def auth_role(other_roles=None):
         :param func: {function}` the function to wrap around
         :return:
         """
+        # Append service name to function name to form role
+        # e.g customer_update_user
+        from config import Config
+
+        generated_role = Config.APP_NAME + "_" + func.__name__
+        authorized_roles = frozenset(
+            (other_roles.split("|") if other_roles else []) + [generated_role]
+        )
+        pass_user_id = "user_id" in inspect.getfullargspec(func).args
 
         @wraps(func)
         def view_wrapper(*args, **kwargs):
@@ -25,33 +42,12 @@ def auth_role(other_roles=None):
 
             token = authorization_header.split()[1]
             try:
-                key = os.getenv("JWT_PUBLIC_KEY")  # noqa E501
-                payload = jwt.decode(
-                    token,
-                    key=key,
-                    algorithms=["HS256", "RS256"],
-                    audience="account",
-                    issuer=os.getenv("JWT_ISSUER"),
-                )  # noqa E501
+                payload = verify_token(token)
                 # Get realm roles from payload
                 available_roles = payload.get("realm_access").get("roles")
 
-                # Append service name to function name to form role
-                # e.g customer_update_user
-                from config import Config
-
-                service_name = Config.APP_NAME
-                generated_role = service_name + "_" + func.__name__
-
-                authorized_roles = []
-
-                if other_roles:
-                    authorized_roles = other_roles.split("|")
-
-                authorized_roles.append(generated_role)
-
-                if is_authorized(authorized_roles, available_roles):
-                    if "user_id" in inspect.getfullargspec(func).args:
+                if not authorized_roles.isdisjoint(available_roles):
+                    if pass_user_id:
                         kwargs["user_id"] = payload.get(
                             "preferred_username"
                         )  # noqa E501
@@ -69,9 +65,78 @@ def auth_role(other_roles=None):
     return authorize_user
 
 
-def is_authorized(access_roles, available_roles):
-    for role in access_roles:
-        if role in available_roles:
-            return True
+def verify_token(token: str) -> dict:
+    """
+    Verifies the signature and claims of the token and returns its payload.
+    The token is verified with the JWKS key matching its kid header when
+    JWT_JWKS_URL or JWT_JWKS_FILE is set, with JWT_PUBLIC_KEY otherwise.
+    Payloads are kept in token_cache until the token expires, so the
+    signature of a token is verified once instead of on every request
+    :param token: {str} encoded JWT
+    :return: {dict} the token payload
+    """
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return payload
+
+    key = public_key(os.getenv("JWT_PUBLIC_KEY"))
+    algorithms = key_algorithms(key)
+    provider = jwks_provider()
+    if provider is not None:
+        signing_key = provider.get_key(jwt.get_unverified_header(token).get("kid"))
+        key, algorithms = signing_key.key, [signing_key.algorithm]
+
+    payload = jwt.decode(
+        token,
+        key=key,
+        algorithms=algorithms,
+        audience="account",
+        issuer=os.getenv("JWT_ISSUER"),
+    )
+    ttl = token_cache.ttl
+    if "exp" in payload:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(cache_key, payload, ttl)
+    return payload
+
+
+@lru_cache(maxsize=8)
+def public_key(key):
+    """
+    Parses a PEM encoded public key once instead of on every jwt.decode.
+    Other keys, e.g. HS256 secrets, are returned as they are
+    """
+    if not key or "-----BEGIN" not in key:
+        return key
+    from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+    try:
+        return load_pem_public_key(key.encode())
+    except ValueError:
+        return key
+
+
+def key_algorithms(key) -> list:
+    """
+    returns the algorithms a token verified with the key may be signed with.
+    A parsed public key only accepts the algorithms of its own family, so a
+    token can not pick HS256 and have the public key used as its secret.
+    HS256 is accepted for raw secrets only
+    """
+    if key is None or isinstance(key, (str, bytes)):
+        return ["HS256", "RS256"]
+    from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+
+    if isinstance(key, rsa.RSAPublicKey):
+        return ["RS256"]
+    if isinstance(key, ec.EllipticCurvePublicKey):
+        return ["ES256"]
+    if isinstance(key, (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey)):
+        return ["EdDSA"]
+    return []
 
-    return False
+
+def is_authorized(access_roles, available_roles):
+    return not set(access_roles).isdisjoint(available_roles)
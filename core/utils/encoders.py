@@ -1,10 +1,70 @@
-from typing import Any
-import json
+import datetime
+import decimal
+import enum
+import uuid
+from typing import Any, Callable
+
 from bson import ObjectId
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+# encoder of each type, looked up by the exact type of the value first and
+# then along its mro
+_encoders = {
+    ObjectId: str,
+    uuid.UUID: str,
+    datetime.datetime: datetime.datetime.isoformat,
+    datetime.date: datetime.date.isoformat,
+    datetime.time: datetime.time.isoformat,
+    decimal.Decimal: str,
+    enum.Enum: lambda value: value.value,
+}
+# encoders resolved for subclasses of registered types
+_resolved = {}
+
+
+def register_encoder(python_type: type, encode: Callable[[Any], Any]):
+    """
+    Registers how values of python_type, and its subclasses, are encoded to
+    JSON by every JSON backend of the app
+    :param python_type: {type}
+    :param encode: {callable} returns a JSON serializable value
+    """
+    _encoders[python_type] = encode
+    _resolved.clear()
+
+
+def encoder_for(python_type: type):
+    """
+    returns the encoder registered for the type or its closest base class,
+    None when there is none
+    """
+    encode = _encoders.get(python_type) or _resolved.get(python_type)
+    if encode is None:
+        for base in python_type.__mro__[1:]:
+            if base in _encoders:
+                encode = _resolved[python_type] = _encoders[base]
+                break
+    return encode
+
+
+def encode_default(o: Any) -> Any:
+    """
+    `default` hook for JSON backends, encodes the registered types
+    """
+    encode = encoder_for(type(o))
+    if encode is None:
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+    return encode(o)
+
 
+class JSONEncoder(FlaskJSONEncoder):
+    """
+    Flask's JSON encoder using the encoder registry, installed as the app's
+    json_encoder. Types missing from the registry are left to Flask
+    """
 
-class JSONEncoder(json.JSONEncoder):
     def default(self, o: Any) -> Any:
-        if isinstance(o, ObjectId):
-            return str(o)
-        return super().default(self, o)
+        encode = encoder_for(type(o))
+        if encode is not None:
+            return encode(o)
+        return super().default(o)
@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+
+from jwt import PyJWK
+from jwt.exceptions import InvalidTokenError, PyJWKClientError, PyJWTError
+
+logger = logging.getLogger(__name__)
+
+SigningKey = namedtuple("SigningKey", ["key", "algorithm"])
+
+# algorithm of the keys whose JWK has no alg member
+_DEFAULT_ALGORITHMS = {"RSA": "RS256", "EC": "ES256", "OKP": "EdDSA"}
+
+
+class JWKSProvider:
+    """
+    Keeps the signing keys of a JWKS document, fetched from a url or read
+    from a file, parsed by key id. Keys are refreshed in the background before
+    they are max_age seconds old. A token signed with an unknown key id, or a
+    request made while the keys are stale, triggers a refetch at most once
+    every cooldown seconds, so invalid tokens can not flood the identity
+    provider with requests
+    """
+
+    def __init__(self, url=None, path=None, max_age=300, cooldown=60, timeout=5):
+        assert url or path, "Missing JWKS url or file"
+
+        self.url = url
+        self.path = path
+        self.max_age = max_age
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self._keys = {}
+        self._fetched_at = None
+        self._refetched_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get_key(self, kid) -> SigningKey:
+        """
+        returns the parsed key of the key id passed and its algorithm. A token
+        without a key id can only be verified when the document holds a single
+        key
+        :param kid: {str} kid header of the token
+        :raises InvalidTokenError: the key id is unknown
+        """
+        if self._is_stale() or self._find(kid) is None:
+            if self._may_refetch():
+                self._refresh_safely()
+
+        key = self._find(kid)
+        if key is None:
+            raise InvalidTokenError(f"Unknown signing key {kid}")
+        return key
+
+    def refresh(self):
+        """
+        fetches and parses the JWKS document. Keys that can not be used, e.g.
+        encryption keys, symmetric keys or unsupported algorithms, are skipped
+        :raises ValueError: the document has no keys list, or none of its keys
+        can be used. The current keys are kept
+        """
+        document = self._fetch()
+        if not isinstance(document, dict) or not isinstance(document.get("keys"), list):
+            raise ValueError("JWKS document has no keys list")
+
+        keys = {}
+        for jwk in document["keys"]:
+            if not isinstance(jwk, dict):
+                continue
+            algorithm = jwk.get("alg") or _DEFAULT_ALGORITHMS.get(jwk.get("kty"))
+            if jwk.get("use", "sig") != "sig" or algorithm is None:
+                continue
+            try:
+                keys[jwk.get("kid")] = SigningKey(PyJWK(jwk, algorithm).key, algorithm)
+            except PyJWTError as e:
+                logger.warning("Skipping JWKS key %s: %s", jwk.get("kid"), e)
+        if not keys:
+            raise ValueError("JWKS document has no usable signing key")
+
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def start(self):
+        """
+        refreshes the keys in a daemon thread before they get stale
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._refresh_periodically, name="jwks-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _refresh_periodically(self):
+        while not self._stop.is_set():
+            try:
+                self._refresh_safely()
+            except Exception:
+                # the thread must outlive unexpected errors, or the keys are
+                # never refreshed again
+                logger.exception("Unexpected error refreshing JWKS")
+            # retry failed fetches after the cooldown instead of waiting for
+            # the next refresh
+            self._stop.wait(self.cooldown if self._is_stale() else self.max_age * 0.8)
+
+    def _refresh_safely(self):
+        """
+        refreshes the keys, keeping the current keys when the document can
+        not be fetched
+        """
+        try:
+            self.refresh()
+        except (OSError, ValueError, PyJWKClientError) as e:
+            logger.error("Failed to fetch JWKS from %s: %s", self.url or self.path, e)
+
+    def _fetch(self) -> dict:
+        if self.path:
+            with open(self.path) as f:
+                return json.load(f)
+        with urllib.request.urlopen(self.url, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def _find(self, kid):
+        keys = self._keys
+        if kid is None and len(keys) == 1:
+            return next(iter(keys.values()))
+        return keys.get(kid)
+
+    def _is_stale(self) -> bool:
+        return (
+            self._fetched_at is None
+            or time.monotonic() - self._fetched_at > self.max_age
+        )
+
+    def _may_refetch(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if (
+                self._refetched_at is not None
+                and now - self._refetched_at < self.cooldown
+            ):
+                return False
+            self._refetched_at = now
+            return True
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def jwks_provider():
+    """
+    returns the provider of the JWKS document configured with the
+    JWT_JWKS_URL or JWT_JWKS_FILE environment variables, None when neither is
+    set. JWT_JWKS_MAX_AGE and JWT_JWKS_COOLDOWN set the refresh interval and
+    the unknown key refetch cooldown in seconds
+    """
+    url = os.getenv("JWT_JWKS_URL")
+    path = os.getenv("JWT_JWKS_FILE")
+    if not url and not path:
+        return None
+
+    with _providers_lock:
+        provider = _providers.get((url, path))
+        if provider is None:
+            provider = _providers[(url, path)] = JWKSProvider(
+                url=url,
+                path=path,
+                max_age=int(os.getenv("JWT_JWKS_MAX_AGE", 300)),
+                cooldown=int(os.getenv("JWT_JWKS_COOLDOWN", 60)),
+            )
+            provider.start()
+    return provider
@@ -1,6 +1,8 @@
 from functools import wraps
 from flask import request
+from marshmallow import ValidationError
 
+from .. import serialization
 from ..exceptions import AppException
 
 
@@ -13,7 +15,7 @@ def validator(schema):
 
         @wraps(func)
         def view_wrapper(*args, **kwargs):
-            errors = schema().validate(request.json)
+            errors = serialization.get_schema(schema).validate(request.json)
             if errors:
                 raise AppException.ValidationException(context=errors)
 
@@ -22,3 +24,28 @@ def validator(schema):
         return view_wrapper
 
     return validate_data
+
+
+def load_data(schema, many=False, argument="data"):
+    def load_request_data(func):
+        """
+        A wrapper that deserializes the request body with a marshmallow schema
+        and passes the result to the view, validating and loading it in a
+        single pass
+        :param func: {function} the function to wrap around
+        """
+
+        @wraps(func)
+        def view_wrapper(*args, **kwargs):
+            try:
+                data = serialization.get_schema(schema, many).load(request.json)
+            except ValidationError as e:
+                # with many, the errors are keyed by the index of each item
+                raise AppException.ValidationException(context=e.messages)
+
+            kwargs[argument] = data
+            return func(*args, **kwargs)
+
+        return view_wrapper
+
+    return load_request_data
@@ -0,0 +1,43 @@
+import mongoengine
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from core.exceptions import AppExceptionCase, app_exception_handler
+from core.extensions import db
+
+from .models import Retailer
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI="sqlite://", SQLALCHEMY_TRACK_MODIFICATIONS=False
+    )
+    app.errorhandler(AppExceptionCase)(app_exception_handler)
+    db.init_app(app)
+
+    with app.app_context():
+        # let SQLAlchemy emit BEGIN so that pysqlite supports savepoints
+        @event.listens_for(db.engine, "connect")
+        def connect(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(db.engine, "begin")
+        def begin(connection):
+            connection.exec_driver_sql("BEGIN")
+
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def mongo(app):
+    connection = mongoengine.connect("test", host="mongomock://localhost")
+    Retailer.ensure_indexes()
+    yield connection
+    Retailer.drop_collection()
+    mongoengine.disconnect()
@@ -0,0 +1,45 @@
+import datetime
+import uuid
+
+import mongoengine
+
+from core.extensions import db
+from core.repository import MongoBaseRepository, SQLBaseRepository
+
+
+class Distributor(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String, unique=True, nullable=False)
+    location = db.Column(db.String)
+    created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    modified = db.Column(
+        db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
+    )
+    employees = db.relationship("Employee", backref="distributor", lazy=True)
+
+
+class Employee(db.Model):
+    id = db.Column(db.GUID(), primary_key=True, default=uuid.uuid4)
+    first_name = db.Column(db.String)
+    email_address = db.Column(db.String, unique=True)
+    distributor_id = db.Column(
+        db.Integer, db.ForeignKey("distributor.id"), nullable=False
+    )
+
+
+class Retailer(mongoengine.Document):
+    name = mongoengine.StringField(unique=True)
+    location = mongoengine.StringField(db_field="loc")
+    score = mongoengine.IntField(default=0)
+
+
+class DistributorRepository(SQLBaseRepository):
+    model = Distributor
+
+
+class EmployeeRepository(SQLBaseRepository):
+    model = Employee
+
+
+class RetailerRepository(MongoBaseRepository):
+    model = Retailer
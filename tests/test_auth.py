@@ -0,0 +1,64 @@
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jwt.exceptions import InvalidTokenError
+
+from core.utils.auth import key_algorithms, public_key, token_cache, verify_token
+
+rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def pem(private_key) -> str:
+    return (
+        private_key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+
+
+def encode(key, algorithm) -> str:
+    claims = {"aud": "account", "iss": "issuer", "exp": int(time.time()) + 300}
+    return jwt.encode(claims, key, algorithm=algorithm)
+
+
+@pytest.fixture(autouse=True)
+def environment(monkeypatch):
+    monkeypatch.delenv("JWT_JWKS_URL", raising=False)
+    monkeypatch.delenv("JWT_JWKS_FILE", raising=False)
+    monkeypatch.setenv("JWT_ISSUER", "issuer")
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+def test_rsa_public_key_verifies_rs256_tokens(monkeypatch):
+    monkeypatch.setenv("JWT_PUBLIC_KEY", pem(rsa_key))
+
+    assert verify_token(encode(rsa_key, "RS256"))["iss"] == "issuer"
+
+
+def test_rsa_public_key_rejects_hs256_tokens(monkeypatch):
+    monkeypatch.setenv("JWT_PUBLIC_KEY", pem(rsa_key))
+
+    with pytest.raises(InvalidTokenError):
+        verify_token(encode("secret", "HS256"))
+
+
+def test_secret_verifies_hs256_tokens(monkeypatch):
+    monkeypatch.setenv("JWT_PUBLIC_KEY", "secret")
+
+    assert verify_token(encode("secret", "HS256"))["iss"] == "issuer"
+
+
+def test_key_algorithms():
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+
+    assert key_algorithms(public_key(pem(rsa_key))) == ["RS256"]
+    assert key_algorithms(public_key(pem(ec_key))) == ["ES256"]
+    assert key_algorithms("secret") == ["HS256", "RS256"]
@@ -0,0 +1,94 @@
+import pytest
+
+from core.exceptions import AppException
+
+from .models import Distributor, DistributorRepository
+
+
+def names():
+    return sorted(distributor.name for distributor in Distributor.query)
+
+
+def test_create_many(app):
+    created = DistributorRepository().create_many([{"name": "a"}, {"name": "b"}])
+
+    assert created == 2
+    assert names() == ["a", "b"]
+
+
+def test_create_many_reports_rows_conflicting_with_existing_rows(app):
+    repository = DistributorRepository()
+    repository.create({"name": "a"})
+
+    with pytest.raises(AppException.OperationError) as error:
+        repository.create_many([{"name": "b"}, {"name": "a"}, {"name": "c"}])
+
+    assert [row["index"] for row in error.value.context] == [1]
+    assert "UNIQUE" in error.value.context[0]["error"]
+    assert names() == ["a"]
+
+
+def test_create_many_reports_duplicates_within_the_batch(app):
+    with pytest.raises(AppException.OperationError) as error:
+        DistributorRepository().create_many(
+            [{"name": "a"}, {"name": "b"}, {"name": "a"}, {"name": "b"}]
+        )
+
+    # every row is valid on its own, only the later copies conflict
+    assert [row["index"] for row in error.value.context] == [2, 3]
+    assert names() == []
+
+
+def test_update_many(app):
+    repository = DistributorRepository()
+    repository.create_many([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+    ids = [
+        distributor.id for distributor in Distributor.query if distributor.name != "c"
+    ]
+
+    updated = repository.update_many(ids, {"location": "accra"})
+
+    assert updated == 2
+    assert {d.name: d.location for d in Distributor.query} == {
+        "a": "accra",
+        "b": "accra",
+        "c": None,
+    }
+
+
+def test_update_many_ignores_attributes_that_are_not_columns(app):
+    repository = DistributorRepository()
+    repository.create_many([{"name": "a"}])
+    ids = [distributor.id for distributor in Distributor.query]
+
+    updated = repository.update_many(
+        ids, {"location": "accra", "employees": [], "query": None}
+    )
+
+    assert updated == 1
+    assert Distributor.query.one().location == "accra"
+
+
+def test_update_many_reports_rows_that_conflict_together(app):
+    repository = DistributorRepository()
+    repository.create_many([{"name": "a"}, {"name": "b"}])
+    ids = [distributor.id for distributor in Distributor.query.order_by("id")]
+
+    with pytest.raises(AppException.OperationError) as error:
+        repository.update_many(ids, {"name": "same"})
+
+    assert [row["id"] for row in error.value.context] == [str(ids[1])]
+    assert names() == ["a", "b"]
+
+
+def test_delete_many(app):
+    repository = DistributorRepository()
+    repository.create_many([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+    ids = [
+        distributor.id for distributor in Distributor.query if distributor.name != "c"
+    ]
+
+    deleted = repository.delete_many(ids)
+
+    assert deleted == 2
+    assert names() == ["c"]
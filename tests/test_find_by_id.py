@@ -0,0 +1,52 @@
+import pytest
+
+from core.cache import LRUCache
+from core.extensions import db
+
+from .models import DistributorRepository
+
+
+class CachedDistributorRepository(DistributorRepository):
+    cache = LRUCache(maxsize=16)
+
+
+@pytest.fixture
+def repository(app):
+    repository = CachedDistributorRepository()
+    repository.cache.clear()
+    distributor_id = repository.create({"name": "a"}).id
+    db.session.remove()
+    return repository, distributor_id
+
+
+def test_cache_hit_keeps_unsaved_changes(repository):
+    repository, distributor_id = repository
+    repository.find_by_id(distributor_id)
+    db.session.remove()
+
+    distributor = repository.find_by_id(distributor_id)
+    distributor.name = "changed"
+
+    assert repository.find_by_id(distributor_id) is distributor
+    assert distributor.name == "changed"
+
+
+def test_cache_hit_builds_the_object_without_querying(repository):
+    repository, distributor_id = repository
+    repository.find_by_id(distributor_id)
+    db.session.remove()
+    hits = repository.cache.hits
+
+    distributor = repository.find_by_id(distributor_id)
+
+    assert distributor.name == "a"
+    assert repository.cache.hits == hits + 1
+
+
+def test_uncached_find_keeps_unsaved_changes(app):
+    repository = DistributorRepository()
+    distributor_id = repository.create({"name": "a"}).id
+    distributor = repository.find_by_id(distributor_id)
+    distributor.name = "changed"
+
+    assert repository.find_by_id(distributor_id).name == "changed"
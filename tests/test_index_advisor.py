@@ -0,0 +1,35 @@
+import pytest
+
+from core.index_advisor import init_index_advisor
+
+from .models import DistributorRepository
+
+
+@pytest.fixture
+def advised_app(app, tmp_path):
+    app.config.update(
+        DB_ENGINE="POSTGRES",
+        INDEX_ADVISOR_RECORD=True,
+        INDEX_ADVISOR_FILE=str(tmp_path / "recording" / "index_advisor.jsonl"),
+    )
+    init_index_advisor(app)
+    yield app
+    app.test_cli_runner().invoke(args=["index", "reset"])
+
+
+def test_advise_suggests_indexes_for_recorded_filters(advised_app):
+    DistributorRepository().find_all({"location": "accra"})
+
+    result = advised_app.test_cli_runner().invoke(args=["index", "advise"])
+
+    assert result.exit_code == 0
+    assert "ON distributor (location);" in result.output
+    assert "ON employee (distributor_id);" in result.output
+
+
+def test_reset_removes_the_recording(advised_app):
+    DistributorRepository().find_all({"location": "accra"})
+    runner = advised_app.test_cli_runner()
+
+    assert runner.invoke(args=["index", "reset"]).output == "Recorded filters removed\n"
+    assert "distributor (location)" not in runner.invoke(args=["index", "advise"]).output
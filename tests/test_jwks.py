@@ -0,0 +1,148 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+from jwt.exceptions import InvalidTokenError
+
+from core.utils.jwks import JWKSProvider
+
+
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def jwk(private_key, kid) -> dict:
+    return {
+        **json.loads(RSAAlgorithm.to_jwk(private_key.public_key())),
+        "kid": kid,
+        "use": "sig",
+        "alg": "RS256",
+    }
+
+
+class JWKSServer:
+    """
+    Serves a JWKS document on localhost and counts the requests it receives
+    """
+
+    def __init__(self, document):
+        self.body = json.dumps(document).encode()
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits += 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/jwks.json"
+        threading.Thread(
+            target=self.httpd.serve_forever, args=(0.05,), daemon=True
+        ).start()
+
+    def serve(self, document):
+        self.body = json.dumps(document).encode()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+key_a = signing_key()
+key_b = signing_key()
+
+
+@pytest.fixture
+def server():
+    server = JWKSServer({"keys": [jwk(key_a, "a")]})
+    yield server
+    server.close()
+
+
+def test_get_key_fetches_the_document(server):
+    provider = JWKSProvider(url=server.url)
+    token = jwt.encode({"sub": "bob"}, key_a, algorithm="RS256", headers={"kid": "a"})
+
+    signing = provider.get_key("a")
+
+    assert signing.algorithm == "RS256"
+    assert jwt.decode(token, signing.key, algorithms=[signing.algorithm])["sub"] == "bob"
+    assert server.hits == 1
+
+
+def test_unknown_key_id_refetches_rotated_keys(server):
+    provider = JWKSProvider(url=server.url, cooldown=0)
+    provider.refresh()
+    server.serve({"keys": [jwk(key_b, "b")]})
+
+    assert provider.get_key("b").algorithm == "RS256"
+    assert server.hits == 2
+
+
+def test_unknown_key_ids_refetch_once_per_cooldown(server):
+    provider = JWKSProvider(url=server.url, cooldown=60)
+    provider.refresh()
+
+    for _ in range(10):
+        with pytest.raises(InvalidTokenError):
+            provider.get_key("unknown")
+
+    assert server.hits == 2
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        [],
+        {},
+        {"keys": {}},
+        {"keys": []},
+        {"keys": ["a"]},
+        {"keys": [{**jwk(key_b, "b"), "use": "enc"}]},
+    ],
+)
+def test_unusable_document_keeps_the_current_keys(server, document):
+    provider = JWKSProvider(url=server.url)
+    provider.refresh()
+    server.serve(document)
+
+    with pytest.raises(ValueError):
+        provider.refresh()
+
+    assert provider.get_key("a").algorithm == "RS256"
+
+
+def test_refresh_thread_survives_unexpected_errors(server, monkeypatch):
+    provider = JWKSProvider(url=server.url, max_age=0.05, cooldown=0.01)
+    refresh = provider.refresh
+    calls = []
+
+    def failing_refresh():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("unexpected")
+        refresh()
+
+    monkeypatch.setattr(provider, "refresh", failing_refresh)
+    provider.start()
+    try:
+        deadline = time.monotonic() + 5
+        while server.hits < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert provider._thread.is_alive()
+        assert server.hits >= 2
+    finally:
+        provider.stop()
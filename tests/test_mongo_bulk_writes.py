@@ -0,0 +1,130 @@
+import mongomock
+import pytest
+from bson import ObjectId
+
+from core.exceptions import AppException
+
+from .models import Retailer, RetailerRepository
+
+
+@pytest.fixture
+def bulk_writes(mongo, monkeypatch):
+    """
+    records the write concern and the number of operations of every bulk_write
+    """
+    calls = []
+    bulk_write = mongomock.Collection.bulk_write
+
+    def recording_bulk_write(collection, requests, *args, **kwargs):
+        calls.append((collection.write_concern.document, len(requests)))
+        return bulk_write(collection, requests, *args, **kwargs)
+
+    monkeypatch.setattr(mongomock.Collection, "bulk_write", recording_bulk_write)
+    return calls
+
+
+class BatchedRetailerRepository(RetailerRepository):
+    batch_size = 2
+    write_concern = {"w": 1, "j": True}
+
+
+def names():
+    return sorted(retailer.name for retailer in Retailer.objects)
+
+
+def test_create_many_sends_batches(bulk_writes):
+    created = BatchedRetailerRepository().create_many(
+        [{"name": f"r{index}"} for index in range(5)]
+    )
+
+    assert created == 5
+    assert [size for _, size in bulk_writes] == [2, 2, 1]
+    assert names() == [f"r{index}" for index in range(5)]
+
+
+def test_bulk_writes_use_the_write_concern(bulk_writes):
+    repository = BatchedRetailerRepository()
+    repository.create_many([{"name": "a"}])
+    ids = [retailer.pk for retailer in Retailer.objects]
+    repository.update_many(ids, {"score": 1})
+    repository.upsert_many([{"name": "a", "score": 2}], conflict_target=("name",))
+    repository.delete_many(ids)
+
+    assert [concern for concern, _ in bulk_writes] == [{"w": 1, "j": True}] * 4
+
+
+def test_default_write_concern(bulk_writes):
+    RetailerRepository().create_many([{"name": "a"}])
+
+    assert bulk_writes == [({}, 1)]
+
+
+def test_create_many_writes_valid_documents_and_reports_the_others(mongo):
+    repository = BatchedRetailerRepository()
+    repository.create({"name": "taken"})
+
+    with pytest.raises(AppException.OperationError) as error:
+        repository.create_many(
+            [{"name": "a"}, {"name": "taken"}, {"name": "b", "score": "high"}]
+        )
+
+    context = error.value.context
+    assert context["written"] == 1
+    assert [row["index"] for row in context["errors"]] == [2, 1]
+    assert names() == ["a", "taken"]
+
+
+def test_update_many_reports_invalid_ids(mongo):
+    repository = RetailerRepository()
+    repository.create_many([{"name": "a"}, {"name": "b"}])
+    ids = [retailer.pk for retailer in Retailer.objects]
+
+    with pytest.raises(AppException.OperationError) as error:
+        repository.update_many([*ids, "not an id"], {"score": 3})
+
+    assert error.value.context["written"] == 2
+    assert error.value.context["errors"][0]["id"] == "not an id"
+    assert [retailer.score for retailer in Retailer.objects] == [3, 3]
+
+
+def test_delete_many_reports_invalid_ids(mongo):
+    repository = RetailerRepository()
+    repository.create_many([{"name": "a"}, {"name": "b"}])
+    ids = [retailer.pk for retailer in Retailer.objects]
+
+    assert repository.delete_many([ids[0], ObjectId()]) == 1
+    with pytest.raises(AppException.OperationError) as error:
+        repository.delete_many([ids[1], "not an id"])
+
+    assert error.value.context["written"] == 1
+    assert [row["id"] for row in error.value.context["errors"]] == ["not an id"]
+    assert names() == []
+
+
+def test_upsert_many_sends_batches(bulk_writes):
+    repository = BatchedRetailerRepository()
+    repository.create({"name": "a"})
+
+    written = repository.upsert_many(
+        [{"name": "a", "score": 1}, {"name": "b"}, {"name": "c"}],
+        conflict_target=("name",),
+    )
+
+    assert written == 3
+    assert [size for _, size in bulk_writes] == [2, 1]
+    assert {r.name: r.score for r in Retailer.objects} == {"a": 1, "b": 0, "c": 0}
+
+
+def test_upsert_many_reports_the_written_count(mongo):
+    repository = RetailerRepository()
+    repository.create_many([{"name": "a"}, {"name": "b", "location": "x"}])
+
+    with pytest.raises(AppException.OperationError) as error:
+        # the second document takes the name of an existing document
+        repository.upsert_many(
+            [{"name": "c", "location": "y"}, {"name": "a", "location": "x"}],
+            conflict_target=("location",),
+        )
+
+    assert error.value.context["written"] == 1
+    assert [row["index"] for row in error.value.context["errors"]] == [1]
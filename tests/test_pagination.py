@@ -0,0 +1,101 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from core.exceptions import AppException
+from core.repository.base.pagination import decode_cursor, encode_cursor
+
+from .models import DistributorRepository, EmployeeRepository, RetailerRepository
+
+
+def tampered(values) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def test_decode_cursor_restores_column_types():
+    created = datetime(2021, 5, 1, 12, 30)
+    key = uuid.uuid4()
+    cursor = encode_cursor([created, 3, key])
+
+    assert decode_cursor(cursor, [datetime, int, uuid.UUID]) == [created, 3, key]
+
+
+@pytest.mark.parametrize(
+    "values, python_types",
+    [
+        ([{"a": 1}], [int]),
+        ([[1]], [str]),
+        ([None], [int]),
+        (["abc"], [int]),
+        ([True], [int]),
+        (["not a uuid"], [uuid.UUID]),
+        ([1], [uuid.UUID]),
+        (["yesterday"], [datetime]),
+        ([1, 2], [int]),
+    ],
+)
+def test_decode_cursor_rejects_tampered_values(app, values, python_types):
+    with pytest.raises(AppException.BadRequest):
+        decode_cursor(tampered(values), python_types)
+
+
+def test_decode_cursor_rejects_garbage(app):
+    with pytest.raises(AppException.BadRequest):
+        decode_cursor("%%%", [int])
+
+
+def test_sql_paginate_walks_every_page(app):
+    repository = DistributorRepository()
+    repository.create_many([{"name": f"d{index}"} for index in range(5)])
+
+    page = repository.paginate(limit=2)
+    names = [item.name for item in page.items]
+    while page.next_cursor:
+        page = repository.paginate(cursor=page.next_cursor, limit=2)
+        names += [item.name for item in page.items]
+
+    assert names == [f"d{index}" for index in range(5)]
+
+
+@pytest.mark.parametrize("values", [[{"a": 1}], ["abc"], ["1"] * 2])
+def test_sql_paginate_rejects_tampered_cursor(app, values):
+    with pytest.raises(AppException.BadRequest):
+        DistributorRepository().paginate(cursor=tampered(values))
+
+
+def test_sql_paginate_rejects_invalid_uuid_cursor(app):
+    with pytest.raises(AppException.BadRequest):
+        EmployeeRepository().paginate(cursor=tampered(["not a uuid"]))
+
+
+def test_sql_paginate_tampered_cursor_is_a_bad_request(app):
+    @app.route("/distributors")
+    def distributors():
+        DistributorRepository().paginate(cursor=tampered([{"a": 1}]))
+
+    response = app.test_client().get("/distributors")
+
+    assert response.status_code == 400
+
+
+def test_mongo_paginate_walks_every_page(mongo):
+    repository = RetailerRepository()
+    repository.create_many([{"name": f"r{index}"} for index in range(5)])
+
+    page = repository.paginate(limit=2)
+    names = [item.name for item in page.items]
+    while page.next_cursor:
+        page = repository.paginate(cursor=page.next_cursor, limit=2)
+        names += [item.name for item in page.items]
+
+    assert names == [f"r{index}" for index in range(5)]
+
+
+@pytest.mark.parametrize("values", [["not an object id"], [{"a": 1}], [None]])
+def test_mongo_paginate_rejects_tampered_cursor(mongo, values):
+    with pytest.raises(AppException.BadRequest):
+        RetailerRepository().paginate(cursor=tampered(values))
@@ -0,0 +1,80 @@
+import pytest
+from flask import Flask
+
+from core.extensions import db
+
+from .models import Distributor
+
+
+class AuditEntry(db.Model):
+    __bind_key__ = "audit"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String)
+
+
+DATABASES = {
+    None: Distributor,
+    "replica": Distributor,
+    "audit": AuditEntry,
+    "audit_replica": AuditEntry,
+}
+
+
+@pytest.fixture
+def routed_app(request):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI="sqlite://",
+        SQLALCHEMY_BINDS={key: "sqlite://" for key in DATABASES if key},
+        SQLALCHEMY_REPLICA_BINDS=request.param,
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    db.init_app(app)
+
+    with app.app_context():
+        # every database holds a single row named after it
+        for key, model in DATABASES.items():
+            engine = db.get_engine(app, bind=key)
+            model.__table__.create(engine)
+            with engine.begin() as connection:
+                connection.execute(model.__table__.insert(), {"name": key or "primary"})
+        yield app
+        db.session.remove()
+
+
+def read(model) -> str:
+    with db.session().replica_reads():
+        return model.query.one().name
+
+
+@pytest.mark.parametrize("routed_app", [["replica"]], indirect=True)
+def test_default_database_reads_go_to_its_replicas(routed_app):
+    assert read(Distributor) == "replica"
+
+
+@pytest.mark.parametrize("routed_app", [["replica"]], indirect=True)
+def test_other_binds_are_read_from_their_primary(routed_app):
+    assert read(AuditEntry) == "audit"
+
+
+@pytest.mark.parametrize(
+    "routed_app", [{None: ["replica"], "audit": ["audit_replica"]}], indirect=True
+)
+def test_each_bind_reads_from_its_own_replicas(routed_app):
+    assert read(Distributor) == "replica"
+    assert read(AuditEntry) == "audit_replica"
+
+
+@pytest.mark.parametrize("routed_app", [{"audit": ["audit_replica"]}], indirect=True)
+def test_binds_without_replicas_are_read_from_their_primary(routed_app):
+    assert read(Distributor) == "primary"
+    assert read(AuditEntry) == "audit_replica"
+
+
+@pytest.mark.parametrize("routed_app", [["replica"]], indirect=True)
+def test_reads_after_a_write_go_to_the_primary(routed_app):
+    db.session.add(Distributor(name="new"))
+    db.session.flush()
+
+    with db.session().replica_reads():
+        assert Distributor.query.count() == 2
@@ -0,0 +1,52 @@
+import pytest
+
+from .models import DistributorRepository, EmployeeRepository
+
+
+class JoinedDistributorRepository(DistributorRepository):
+    eager_load = {"employees": "joined"}
+
+
+@pytest.fixture
+def distributors(app):
+    distributors = DistributorRepository()
+    distributors.create_many([{"name": f"d{index}"} for index in range(5)])
+    EmployeeRepository().create_many(
+        [
+            {"first_name": f"e{index}", "distributor_id": distributor.id}
+            for index, distributor in enumerate(distributors.index())
+        ]
+    )
+    return distributors
+
+
+def test_iter_all_streams_in_chunks(distributors):
+    names = [distributor.name for distributor in distributors.iter_all(chunk_size=2)]
+
+    assert names == [f"d{index}" for index in range(5)]
+
+
+@pytest.mark.parametrize(
+    "repository, eager_load",
+    [
+        (JoinedDistributorRepository, None),
+        (DistributorRepository, {"employees": "joined"}),
+        (DistributorRepository, {"employees": "selectin"}),
+    ],
+)
+def test_iter_all_loads_relationships(distributors, repository, eager_load):
+    streamed = list(repository().iter_all(chunk_size=2, eager_load=eager_load))
+
+    assert len(streamed) == 5
+    for distributor in streamed:
+        assert "employees" in distributor.__dict__
+        assert len(distributor.employees) == 1
+
+
+def test_iter_filtered_with_joined_class_plan(distributors):
+    streamed = list(
+        JoinedDistributorRepository().iter_filtered({"name": "d1"}, chunk_size=2)
+    )
+
+    assert [distributor.name for distributor in streamed] == ["d1"]
+    assert [employee.first_name for employee in streamed[0].employees] == ["e1"]
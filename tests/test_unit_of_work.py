@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import event
+
+from core.exceptions import AppException
+from core.extensions import db
+from core.repository import unit_of_work
+from core.repository.unit_of_work import in_unit_of_work
+
+from .models import Distributor, DistributorRepository
+
+
+@pytest.fixture
+def commits(app):
+    commits = []
+    session = db.session()
+
+    def after_commit(session):
+        commits.append(session)
+
+    event.listen(session, "after_commit", after_commit)
+    yield commits
+    event.remove(session, "after_commit", after_commit)
+
+
+def names():
+    db.session.rollback()
+    return sorted(distributor.name for distributor in Distributor.query)
+
+
+def test_writes_flush_and_commit_once_on_exit(commits):
+    repository = DistributorRepository()
+
+    with unit_of_work():
+        repository.create({"name": "a"})
+        repository.create({"name": "b"})
+        # flushed, visible to the transaction, not committed yet
+        assert Distributor.query.count() == 2
+        assert commits == []
+
+    assert len(commits) == 1
+    assert names() == ["a", "b"]
+
+
+def test_exception_rolls_back_every_write(commits):
+    repository = DistributorRepository()
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            repository.create({"name": "a"})
+            raise RuntimeError()
+
+    assert commits == []
+    assert names() == []
+
+
+def test_nested_blocks_commit_with_the_outermost_block(commits):
+    repository = DistributorRepository()
+
+    with unit_of_work() as session:
+        with unit_of_work():
+            repository.create({"name": "a"})
+        assert in_unit_of_work(session)
+        assert commits == []
+        repository.create({"name": "b"})
+
+    assert not in_unit_of_work(db.session())
+    assert len(commits) == 1
+    assert names() == ["a", "b"]
+
+
+def test_decorator(commits):
+    @unit_of_work()
+    def create():
+        DistributorRepository().create({"name": "a"})
+        assert commits == []
+
+    create()
+
+    assert len(commits) == 1
+
+
+def test_failed_bulk_write_only_rolls_back_its_savepoint(app):
+    repository = DistributorRepository()
+    repository.create({"name": "taken"})
+
+    with unit_of_work():
+        repository.create({"name": "before"})
+        with pytest.raises(AppException.OperationError) as error:
+            repository.create_many([{"name": "bulk"}, {"name": "taken"}])
+        repository.create({"name": "after"})
+
+    assert [row["index"] for row in error.value.context] == [1]
+    assert names() == ["after", "before", "taken"]
+
+
+def test_failed_bulk_update_only_rolls_back_its_savepoint(app):
+    repository = DistributorRepository()
+    repository.create_many([{"name": "a"}, {"name": "b"}])
+    ids = [distributor.id for distributor in Distributor.query]
+
+    with unit_of_work():
+        repository.create({"name": "c"})
+        with pytest.raises(AppException.OperationError):
+            repository.update_many(ids, {"name": "same"})
+
+    assert names() == ["a", "b", "c"]